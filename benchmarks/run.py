@@ -0,0 +1,232 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from src.classifiers.banner_load_preprocessor import BannerLoadPreprocessor
+from src.classifiers.fade_load_preprocessor import FadeLoadPreprocessor
+from src.classifiers.ghost_house_preprocessor import GhostHousePreprocessor
+from src.classifiers.tower_castle_preprocessor import TowerCastlePreprocessor
+from src.frame import Frame
+from src.livesplit import Livesplit
+
+
+# Time per frame available at 60fps
+frame_budget_ns = 1e9 / 60
+
+benchmarks_directory = os.path.dirname(os.path.abspath(__file__))
+
+
+def make_images(seed=0):
+    """Fixed gameplay-like, black, banner and fade-in 640x480 RGB images"""
+    rng = np.random.default_rng(seed)
+
+    gameplay = rng.integers(0, 256, (Frame.height, Frame.width, 3), dtype=np.uint8)
+    gameplay = cv2.GaussianBlur(gameplay, (9, 9), 0)
+
+    black = np.zeros((Frame.height, Frame.width, 3), np.uint8)
+
+    banner = black.copy()
+    banner[180:300, 120:520] = (240, 240, 240)
+
+    fade = (gameplay // 4).astype(np.uint8)
+
+    return [gameplay, black, banner, fade]
+
+
+def make_frames(images, count):
+    # New frames every call so their decode caches don't carry over
+    return [Frame(images[i % len(images)], "rgb", i, i / 60) for i in range(count)]
+
+
+def bench_preprocessor(preprocessor_class):
+    def setup(images, count):
+        preprocessor = preprocessor_class()
+        return preprocessor.preprocess, make_frames(images, count)
+    return setup
+
+
+def bench_classifier(images, count):
+    import onnxruntime
+    from src.classifiers.classifier import Classifier
+
+    if not os.path.isfile("models/fade_load.onnx"):
+        raise FileNotFoundError("models/fade_load.onnx not found")
+
+    opts = onnxruntime.SessionOptions()
+    opts.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    classifier = Classifier("models/fade_load.onnx", FadeLoadPreprocessor(), opts, 5)
+    if classifier.model is None:
+        raise RuntimeError("couldn't load models/fade_load.onnx")
+
+    return classifier.update, make_frames(images, count)
+
+
+def bench_switch_detector(images, count):
+    # The detectors package loads onnxruntime, which is optional here
+    from src.detectors.switch_detector import SwitchDetector
+
+    return SwitchDetector().update, make_frames(images, count)
+
+
+def bench_pixmap(images, count):
+    # QPixmap needs an application, which doesn't need a display when rendering offscreen
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    from src.autosplitter import Autosplitter
+
+    bench_pixmap.app = QApplication.instance() or QApplication([])
+
+    def to_pixmap(image):
+        return Autosplitter.cv2_image_to_pixmap(None, image, 560, 420)
+    return to_pixmap, [images[i % len(images)] for i in range(count)]
+
+
+def bench_parse_timer(images, count):
+    timers = ["12.34", "1:23.45", "1:02:03.45"]
+    return Livesplit.parse_timer, [timers[i % len(timers)] for i in range(count)]
+
+
+benchmarks = {
+    "BannerLoadPreprocessor.preprocess": bench_preprocessor(BannerLoadPreprocessor),
+    "FadeLoadPreprocessor.preprocess": bench_preprocessor(FadeLoadPreprocessor),
+    "GhostHousePreprocessor.preprocess": bench_preprocessor(GhostHousePreprocessor),
+    "TowerCastlePreprocessor.preprocess": bench_preprocessor(TowerCastlePreprocessor),
+    "Classifier.update": bench_classifier,
+    "SwitchDetector.update": bench_switch_detector,
+    "Autosplitter.cv2_image_to_pixmap": bench_pixmap,
+    "Livesplit.parse_timer": bench_parse_timer,
+}
+
+
+def run_benchmark(setup, images, iterations=500, rounds=5, warmup=50, alloc_iterations=100):
+    """Get the best of several rounds in ns per call and the peak bytes allocated per call"""
+    func, inputs = setup(images, warmup + iterations * rounds)
+
+    for item in inputs[:warmup]:
+        func(item)
+
+    times = []
+    for r in range(rounds):
+        batch = inputs[warmup + r * iterations:warmup + (r + 1) * iterations]
+        start = time.perf_counter_ns()
+        for item in batch:
+            func(item)
+        times.append((time.perf_counter_ns() - start) / iterations)
+
+    # Measured separately since tracing slows every allocation down
+    func, inputs = setup(images, alloc_iterations)
+    tracemalloc.start()
+    alloc_bytes = 0
+    for item in inputs:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        func(item)
+        alloc_bytes += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+
+    return {
+        "ns_per_frame": min(times),
+        "median_ns_per_frame": sorted(times)[len(times) // 2],
+        "alloc_bytes_per_frame": alloc_bytes / alloc_iterations,
+        "budget_percent": min(times) / frame_budget_ns * 100,
+    }
+
+
+def get_machine():
+    return {"platform": platform.platform(), "processor": platform.processor(),
+            "python": platform.python_version(), "opencv": cv2.__version__, "numpy": np.__version__}
+
+
+def compare(results, baseline, threshold, machine=None):
+    """Get the benchmarks that got slower than the baseline by more than the threshold"""
+    # Timings from other library versions aren't comparable, but are still reported
+    base_machine = baseline.get("machine", {})
+    for key in ("python", "opencv", "numpy"):
+        if machine is not None and base_machine.get(key) != machine.get(key):
+            print(f"Warning: baseline was recorded with {key} {base_machine.get(key)}, this machine has {machine.get(key)}")
+
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if "ns_per_frame" not in result or base is None or "ns_per_frame" not in base:
+            continue
+
+        result["baseline_ratio"] = result["ns_per_frame"] / base["ns_per_frame"]
+        if result["baseline_ratio"] > 1 + threshold:
+            regressions.append(name)
+
+    return regressions
+
+
+def print_results(results):
+    print(f"{'benchmark':40} {'ns/frame':>12} {'budget':>8} {'alloc B/frame':>14} {'vs baseline':>12}")
+    for name, result in results.items():
+        if "skipped" in result:
+            print(f"{name:40} skipped: {result['skipped']}")
+            continue
+
+        ratio = result.get("baseline_ratio")
+        ratio_text = f"{ratio:.2f}x" if ratio is not None else "-"
+        print(f"{name:40} {result['ns_per_frame']:12.0f} {result['budget_percent']:7.2f}% "
+              f"{result['alloc_bytes_per_frame']:14.0f} {ratio_text:>12}")
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run",
+                                     description="Time the per frame detection code on fixed synthetic frames")
+    parser.add_argument("names", nargs="*", help="benchmarks to run, all by default")
+    parser.add_argument("--output", default=os.path.join(benchmarks_directory, "results.json"))
+    parser.add_argument("--baseline", default=os.path.join(benchmarks_directory, "baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown counted as a regression")
+    parser.add_argument("--iterations", type=int, default=500)
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+    # Models are found relative to the install directory
+    os.chdir(os.path.dirname(benchmarks_directory))
+
+    images = make_images()
+    results = {}
+    for name, setup in benchmarks.items():
+        if args.names and name not in args.names:
+            continue
+
+        try:
+            results[name] = run_benchmark(setup, images, args.iterations)
+        except Exception as e:
+            # Optional dependencies like PyQt5, onnxruntime or the models may be missing
+            results[name] = {"skipped": f"{type(e).__name__}: {e}"}
+
+    regressions = []
+    if os.path.isfile(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r") as file:
+            regressions = compare(results, json.load(file), args.threshold, get_machine())
+
+    report = {
+        "machine": get_machine(),
+        "results": results,
+        "regressions": regressions,
+    }
+
+    with open(args.baseline if args.save_baseline else args.output, "w") as file:
+        json.dump(report, file, indent=4)
+
+    print_results(results)
+    if regressions:
+        print(f"Slower than baseline by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,4 @@
+import datetime
 import logging
 import sys
 import os
@@ -13,6 +14,7 @@ from ui.styles import Style
 from src.autosplitter import Autosplitter
 from src.cpu_monitor import CpuMonitor
 from src.route_handler import RouteHandler
+from src.tracing import tracer
 
 from src.main_window_pages.page_dashboard import PageDashboard
 from src.main_window_pages.page_route import PageRoute
@@ -41,8 +43,8 @@ class MainWindow(QObject):
         self.page_settings = PageSettings(self.ui)
 
         # Initialize device list after page_settings is created
-        self.autosplitter.video_capture.sig_device_list_updated.connect(self.page_settings.device_list_updated)
-        self.autosplitter.video_capture.update_device_list()
+        self.autosplitter.sig_device_list_updated.connect(self.page_settings.device_list_updated)
+        self.autosplitter.update_device_list()
 
         self.cpu_monitor = CpuMonitor(1)
         self.cpu_monitor.sig_cpu_usage_update.connect(self.set_cpu_usage)
@@ -72,11 +74,10 @@ class MainWindow(QObject):
         self.autosplitter.sig_next_split.connect(self.page_dashboard.next_split)
         self.autosplitter.sig_prev_split.connect(self.page_dashboard.prev_split)
         self.autosplitter.sig_reset_splits.connect(self.page_dashboard.reset_splits)
-        self.autosplitter.livesplit.sig_connection_status.connect(self.set_livesplit_status)
+        self.autosplitter.sig_livesplit_status.connect(self.set_livesplit_status)
         self.autosplitter.fps_counter.sig_fps_update.connect(self.set_fps)
-        self.autosplitter.video_capture.sig_device_list_updated.connect(self.page_settings.device_list_updated)
-        self.page_settings.sig_livesplit_port_changed.connect(self.autosplitter.livesplit.reconnect_port)
-        self.page_settings.sig_capture_device_changed.connect(self.autosplitter.video_capture.init_capture_device)
+        self.page_settings.sig_livesplit_port_changed.connect(self.autosplitter.engine.livesplit.reconnect_port)
+        self.page_settings.sig_capture_device_changed.connect(self.autosplitter.engine.open_capture)
         # Removed the starting and ending detector connections since they were moved to PageRoute
         self.page_settings.sig_font_size_changed.connect(self.update_font_size)
 
@@ -125,7 +126,7 @@ class MainWindow(QObject):
 
         # Start autosplitter
         self.autosplitter.start()
-        self.autosplitter.running = True
+        self.autosplitter.engine.set_running(True)
 
         # Set current page
         self.ui.stacked_widget_pages.setCurrentWidget(self.ui.page_dashboard)
@@ -200,7 +201,7 @@ class MainWindow(QObject):
         self.ui.label_status.adjustSize()
         
         # Update status indicator color
-        if not self.autosplitter.livesplit.connected:
+        if not self.autosplitter.engine.livesplit.connected:
             # Grey when LiveSplit not connected
             self.ui.label_status_busy_anim.setStyleSheet(f"color: {Color.text_dark_gray};")
         elif waiting:
@@ -255,6 +256,8 @@ class MainWindow(QObject):
             self.autosplitter.terminate()
             self.autosplitter.wait()
 
+        tracer.stop()
+
         import time
         time.sleep(0.1)
 
@@ -320,9 +323,8 @@ if __name__ == "__main__":
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
     # Clear log
-    appdata = os.path.join(os.path.expandvars(r'%LOCALAPPDATA%'), "NSMBW AutoSplit")
-    log_path = os.path.join(appdata, "application.log")
-    os.makedirs(appdata, exist_ok=True)
+    log_path = os.path.join(Config.appdata, "application.log")
+    os.makedirs(Config.appdata, exist_ok=True)
     try:
         with open(log_path, 'w'):
             pass
@@ -335,6 +337,10 @@ if __name__ == "__main__":
 
     Config.init()
 
+    if Config.get_key("trace_enabled", False):
+        tracer.start(os.path.join(Config.appdata, "traces",
+                                  datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S") + ".json"))
+
     app = QApplication(sys.argv)
     load_fonts()
     print("Fonts loaded")
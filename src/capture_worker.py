@@ -0,0 +1,391 @@
+import logging
+import multiprocessing
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from multiprocessing.shared_memory import SharedMemory
+
+from src.frame import Frame
+
+
+class FrameRingBuffer:
+    """Preallocated ring of frame slots written by the capture thread"""
+    def __init__(self, slots=3, slot_size=640 * 480 * 3):
+        # Two slots is the minimum that lets the producer write while the newest frame is read
+        self.slots = max(slots, 2)
+        self.slot_size = slot_size
+        self.buffer = np.zeros((self.slots, slot_size), dtype=np.uint8)
+
+        # Slots hold either decoded RGB images or variable length MJPEG bytes
+        self.slot_shapes = [(0,)] * self.slots
+        self.slot_formats = ["rgb"] * self.slots
+        # Capture sequence number and monotonic capture timestamp of each slot
+        self.slot_seqs = [0] * self.slots
+        self.slot_timestamps = [0.0] * self.slots
+
+        self.write_seq = 0  # Number of frames committed so far
+        self.read_seq = 0  # Sequence number the reader expects next
+        self.interrupted = False
+        self.condition = threading.Condition()
+
+    def get_write_slot(self, shape, pixel_format="rgb"):
+        """Get a view of the slot the next frame has to be written into"""
+        index = self.write_seq % self.slots
+        size = int(np.prod(shape))
+        if size > self.slot_size:
+            return None
+
+        self.slot_shapes[index] = shape
+        self.slot_formats[index] = pixel_format
+        return self.buffer[index, :size].reshape(shape)
+
+    def commit(self, seq, timestamp):
+        """Publish the frame written into the current write slot"""
+        index = self.write_seq % self.slots
+        self.slot_seqs[index] = seq
+        self.slot_timestamps[index] = timestamp
+
+        with self.condition:
+            self.write_seq += 1
+            self.condition.notify_all()
+
+    def read_latest(self, timeout=None):
+        """Wait for a new frame and return a copy of the newest one together with the number of frames skipped"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.write_seq > self.read_seq or self.interrupted, timeout)
+            self.interrupted = False
+            if self.write_seq <= self.read_seq:
+                return False, None, 0
+
+            seq = self.write_seq - 1
+            skipped = seq - self.read_seq
+            self.read_seq = self.write_seq
+            self.condition.notify_all()
+
+            # Copy while holding the lock so the producer can't commit over the slot being read. The copy is
+            # kept on purpose, the frame lives on in later pipeline stages long after the slot is reused
+            index = seq % self.slots
+            shape = self.slot_shapes[index]
+            data = self.buffer[index, :int(np.prod(shape))].reshape(shape).copy()
+            frame = Frame(data, self.slot_formats[index], self.slot_seqs[index], self.slot_timestamps[index])
+            frame.skipped = skipped
+
+        return True, frame, skipped
+
+    def wait_until_read(self, timeout=None):
+        """Wait until the reader has caught up with every committed frame"""
+        with self.condition:
+            return self.condition.wait_for(lambda: self.read_seq >= self.write_seq, timeout)
+
+    def interrupt(self):
+        """Wake a reader waiting for a frame without giving it one"""
+        with self.condition:
+            self.interrupted = True
+            self.condition.notify_all()
+
+    def reset(self):
+        with self.condition:
+            self.write_seq = 0
+            self.read_seq = 0
+            self.condition.notify_all()
+
+
+class CaptureThread(threading.Thread):
+    """Producer thread that keeps grabbing frames from a capture source into a ring buffer"""
+    def __init__(self, capture_source, ring_buffer):
+        threading.Thread.__init__(self, name="CaptureThread", daemon=True)
+
+        self.capture_source = capture_source
+        self.ring_buffer = ring_buffer
+        self.stop_event = threading.Event()
+
+        self.frames_captured = 0
+        self.dropped_frames = 0
+        self.read_errors = 0
+
+        # Sequence numbers count dropped frames too, so gaps show up downstream
+        self.next_seq = 0
+        self.prev_timestamp = None
+        self.prev_source_seq = None
+
+    def run(self):
+        while not self.stop_event.is_set():
+            # Sources that aren't paced in real time must not outrun the reader or frames would be lost
+            if not self.capture_source.realtime and not self.ring_buffer.wait_until_read(0.1):
+                continue
+
+            try:
+                retval, frame = self.capture_source.read()
+            except Exception as e:
+                logging.exception(f"Error reading frame from capture source: {e}")
+                retval, frame = False, None
+
+            if self.capture_source.finished:
+                logging.info("Capture source finished")
+                break
+
+            if not retval or frame is None or frame.size == 0 or not self.write_frame(frame):
+                self.read_errors += 1
+                # Don't spin on a device that stopped delivering frames
+                self.stop_event.wait(0.01)
+                continue
+
+            timestamp, source_seq = self.capture_source.get_frame_time()
+            dropped = self.count_dropped(timestamp, source_seq)
+            seq = self.next_seq + dropped
+            self.next_seq = seq + 1
+
+            self.ring_buffer.commit(seq, timestamp)
+            self.frames_captured += 1
+
+    def count_dropped(self, timestamp, source_seq):
+        """Count the frames lost between the previous frame and this one"""
+        dropped = 0
+        if source_seq is not None and self.prev_source_seq is not None:
+            # Sources with their own sequence numbers report gaps exactly
+            dropped = max(source_seq - self.prev_source_seq - 1, 0)
+        elif self.prev_timestamp is not None and self.capture_source.fps > 0:
+            # Otherwise a gap of 1.5 frame intervals or more means frames went missing
+            intervals = (timestamp - self.prev_timestamp) * self.capture_source.fps
+            dropped = max(int(round(intervals)) - 1, 0)
+
+        self.prev_timestamp = timestamp
+        self.prev_source_seq = source_seq
+        self.dropped_frames += dropped
+        return dropped
+
+    def write_frame(self, frame):
+        """Write a frame into the next ring buffer slot in the format the detectors expect"""
+        if self.capture_source.pixel_format == "jpeg":
+            # Keep the compressed bytes, they are decoded lazily by the consumer
+            frame = frame.reshape(-1)
+            slot = self.ring_buffer.get_write_slot(frame.shape, "jpeg")
+            if slot is None:
+                return False
+            slot[:] = frame
+            return True
+
+        if self.capture_source.pixel_format == "yuyv":
+            # Packed 4:2:2 straight from the kernel buffer, converted lazily by the consumer. The kernel buffer
+            # is requeued on the next read, so it has to be copied out here
+            if frame.shape != (Frame.height, Frame.width, 2):
+                return False
+            slot = self.ring_buffer.get_write_slot(frame.shape, "yuyv")
+            slot[:] = frame
+            return True
+
+        if frame.ndim != 3 or frame.shape[2] != 3:
+            return False
+
+        slot = self.ring_buffer.get_write_slot((Frame.height, Frame.width, 3), "rgb")
+
+        # Resize to 640x480 if needed and convert from BGR to RGB straight into the slot
+        if frame.shape[0] != Frame.height or frame.shape[1] != Frame.width:
+            frame = cv2.resize(frame, (Frame.width, Frame.height), interpolation=cv2.INTER_LINEAR)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=slot)
+        return True
+
+    def stop(self):
+        self.stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(1.0)
+
+
+class SharedFrameRingBuffer:
+    """Frame ring buffer in shared memory, filled by a capture process and read without copying"""
+    pixel_formats = ["rgb", "jpeg", "yuyv"]
+
+    # Header fields
+    WRITE_SEQ, READ_SEQ, LATEST_SLOT, PINNED_SLOT = range(4)
+    # Metadata fields per slot
+    META_SEQ, META_FORMAT, META_NDIM, META_SHAPE = 0, 1, 2, 3
+    META_SIZE = 6
+
+    def __init__(self, shared_memory, condition, slots, slot_size):
+        self.shared_memory = shared_memory
+        self.condition = condition
+        self.slots = slots
+        self.slot_size = slot_size
+
+        # Lay out header, per slot metadata, timestamps and frame data in the one block
+        buffer = shared_memory.buf
+        offset = 0
+        self.header = np.ndarray((4,), dtype=np.int64, buffer=buffer, offset=offset)
+        offset += self.header.nbytes
+        self.meta = np.ndarray((slots, self.META_SIZE), dtype=np.int64, buffer=buffer, offset=offset)
+        offset += self.meta.nbytes
+        self.timestamps = np.ndarray((slots,), dtype=np.float64, buffer=buffer, offset=offset)
+        offset += self.timestamps.nbytes
+        self.buffer = np.ndarray((slots, slot_size), dtype=np.uint8, buffer=buffer, offset=offset)
+
+        self.write_slot = 0
+        # Only set and read in the process that reads frames
+        self.interrupted = False
+
+    @staticmethod
+    def get_size(slots, slot_size):
+        return 8 * (4 + slots * SharedFrameRingBuffer.META_SIZE + slots) + slots * slot_size
+
+    @staticmethod
+    def create(context, slots=4, slot_size=640 * 480 * 3):
+        # Three slots let the producer write while the newest frame is read and another one is pinned
+        slots = max(slots, 3)
+        shared_memory = SharedMemory(create=True, size=SharedFrameRingBuffer.get_size(slots, slot_size))
+        ring_buffer = SharedFrameRingBuffer(shared_memory, context.Condition(), slots, slot_size)
+        ring_buffer.header[:] = [0, 0, -1, -1]
+        return ring_buffer
+
+    @staticmethod
+    def attach(name, condition, slots, slot_size):
+        # The creating process owns the block and unlinks it, this process only maps it
+        shared_memory = SharedMemory(name=name)
+        return SharedFrameRingBuffer(shared_memory, condition, slots, slot_size)
+
+    def get_write_slot(self, shape, pixel_format="rgb"):
+        """Get a view of a slot that is neither the newest frame nor pinned by the reader"""
+        size = int(np.prod(shape))
+        if size > self.slot_size:
+            return None
+
+        with self.condition:
+            index = (self.header[self.LATEST_SLOT] + 1) % self.slots
+            while index == self.header[self.PINNED_SLOT] or index == self.header[self.LATEST_SLOT]:
+                index = (index + 1) % self.slots
+        self.write_slot = index
+
+        self.meta[index, self.META_FORMAT] = self.pixel_formats.index(pixel_format)
+        self.meta[index, self.META_NDIM] = len(shape)
+        self.meta[index, self.META_SHAPE:self.META_SHAPE + len(shape)] = shape
+        return self.buffer[index, :size].reshape(shape)
+
+    def commit(self, seq, timestamp):
+        """Publish the frame written into the current write slot"""
+        self.meta[self.write_slot, self.META_SEQ] = seq
+        self.timestamps[self.write_slot] = timestamp
+
+        with self.condition:
+            self.header[self.LATEST_SLOT] = self.write_slot
+            self.header[self.WRITE_SEQ] += 1
+            self.condition.notify_all()
+
+    def read_latest(self, timeout=None):
+        """Wait for a new frame and return a view of the newest one, valid until the next read"""
+        with self.condition:
+            if self.header is None:
+                return False, None, 0
+
+            self.condition.wait_for(lambda: self.header[self.WRITE_SEQ] > self.header[self.READ_SEQ] or self.interrupted, timeout)
+            self.interrupted = False
+            if self.header[self.WRITE_SEQ] <= self.header[self.READ_SEQ]:
+                return False, None, 0
+
+            skipped = int(self.header[self.WRITE_SEQ] - 1 - self.header[self.READ_SEQ])
+            self.header[self.READ_SEQ] = self.header[self.WRITE_SEQ]
+
+            # Pinning the slot keeps the producer from overwriting it while the frame is in use
+            index = int(self.header[self.LATEST_SLOT])
+            self.header[self.PINNED_SLOT] = index
+            self.condition.notify_all()
+
+        meta = self.meta[index]
+        shape = tuple(int(x) for x in meta[self.META_SHAPE:self.META_SHAPE + meta[self.META_NDIM]])
+        data = self.buffer[index, :int(np.prod(shape))].reshape(shape)
+        frame = Frame(data, self.pixel_formats[meta[self.META_FORMAT]], int(meta[self.META_SEQ]), float(self.timestamps[index]))
+        frame.skipped = skipped
+
+        return True, frame, skipped
+
+    def wait_until_read(self, timeout=None):
+        """Wait until the reader has caught up with every committed frame"""
+        with self.condition:
+            return self.condition.wait_for(lambda: self.header[self.READ_SEQ] >= self.header[self.WRITE_SEQ], timeout)
+
+    def interrupt(self):
+        """Wake a reader waiting for a frame without giving it one"""
+        with self.condition:
+            self.interrupted = True
+            self.condition.notify_all()
+
+    def close(self, unlink=False):
+        if unlink:
+            try:
+                self.shared_memory.unlink()
+            except Exception as e:
+                logging.exception(e)
+
+        # Views into the block have to go before it can be closed
+        with self.condition:
+            self.header = self.meta = self.timestamps = self.buffer = None
+        try:
+            self.shared_memory.close()
+        except BufferError:
+            # A frame still references the block, it is unmapped once that frame is gone
+            pass
+
+
+def run_capture_process(spec, realtime, raw_mjpeg, v4l2, name, condition, slots, slot_size, stop_event, opened):
+    """Entry point of the capture process"""
+    # Imported here so the parent doesn't need the sources to start the process
+    from src.sources import open_source
+
+    source = open_source(spec, realtime, raw_mjpeg, v4l2)
+    opened.value = 1 if source is not None else -1
+    if source is None:
+        return
+
+    ring_buffer = SharedFrameRingBuffer.attach(name, condition, slots, slot_size)
+    capture_thread = CaptureThread(source, ring_buffer)
+    capture_thread.stop_event = stop_event
+
+    try:
+        capture_thread.run()
+    finally:
+        source.release()
+        ring_buffer.close()
+
+
+class CaptureProcess:
+    """Runs a capture source in a child process that writes into a SharedFrameRingBuffer"""
+    def __init__(self, spec, realtime=True, raw_mjpeg=False, v4l2=True, slots=4):
+        # Spawn instead of fork, forking a process with Qt and ONNX threads isn't safe
+        context = multiprocessing.get_context("spawn")
+
+        self.ring_buffer = SharedFrameRingBuffer.create(context, slots)
+        self.stop_event = context.Event()
+        self.opened = context.Value("i", 0)
+        self.process = context.Process(target=run_capture_process, name="CaptureProcess", daemon=True,
+                                       args=(spec, realtime, raw_mjpeg, v4l2, self.ring_buffer.shared_memory.name,
+                                             self.ring_buffer.condition, self.ring_buffer.slots,
+                                             self.ring_buffer.slot_size, self.stop_event, self.opened))
+
+    def start(self, timeout=10.0):
+        """Start the process and wait until it opened its source"""
+        self.process.start()
+
+        start_time = time.monotonic()
+        while self.opened.value == 0 and self.process.is_alive() and time.monotonic() - start_time < timeout:
+            time.sleep(0.01)
+
+        if self.opened.value != 1:
+            logging.error("Capture process failed to open its source")
+            self.stop()
+            return False
+
+        logging.info(f"Capture process started (pid {self.process.pid})")
+        return True
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.process.is_alive():
+            self.process.join(2.0)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+        self.ring_buffer.close(unlink=True)
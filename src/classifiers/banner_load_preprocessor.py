@@ -1,57 +1,45 @@
-import numpy as np
 import cv2
 
-frame_hist = []
+from src.classifiers.frame_history import FrameHistory
+
+
+def fill_convex_hull(mask, dst):
+    """Write the filled convex hull of a 0-1 mask's lit pixels into dst as 0s and 1s"""
+    # Same hull as the one around all of the mask's contours,
+    # fillPoly rasterizes like drawContours does, fillConvexPoly doesn't on the edges
+    dst.fill(0)
+    points = cv2.findNonZero(mask)
+    if points is not None:
+        cv2.fillPoly(dst, [cv2.convexHull(points)], 1, cv2.LINE_8)
+    return dst
 
 
 class BannerLoadPreprocessor:
-    def preprocess(self, image):
-        # Resize
-        image = cv2.resize(image, (32, 24), interpolation=cv2.INTER_NEAREST)
-        # Convert RGB to grayscale
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-        # Threshold at 2
-        th, image = cv2.threshold(image, 2, 255, cv2.THRESH_BINARY)
-
-        # Detect Contours
-        contours, hierarchy = cv2.findContours(image, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-        new_contours = []
-        for contour in contours:
-            for vector in contour:
-                new_contours.append(vector)
-        new_contours = np.asarray(new_contours)
-        new_contours = np.asarray([new_contours])
-
-        # Create Filled Convex Hull
-        if len(new_contours[0]) > 0:
-            hull = []
-            for i in range(len(new_contours)):
-                hull.append(cv2.convexHull(new_contours[i], False))
-
-            image = np.zeros((image.shape[0], image.shape[1]), np.uint8)
-            for i in range(len(new_contours)):
-                color = (255, 255, 255)
-                cv2.drawContours(image, hull, i, color, -1, 8)
-
-        # Rescale 0-255 to 0-1
-        image = image / 255
-        # Expand dimensions from (24, 32) to (24, 32, 1)
-        image = np.expand_dims(image, axis=2)
-        # Rearrange array dimensions (24, 32, 1) to (1, 24, 32)
-        image = image.transpose((2, 0, 1))
-
-        # Create image array
-        frame_hist.append(image)
-        if len(frame_hist) > 19:
-            frame_hist.pop(0)
-
-        if len(frame_hist) < 19:
-            return np.zeros((1, 24, 320))
-
-        image_array = frame_hist[0]
-
-        # Create array of every second frame
-        for image in frame_hist[1::2]:
-            image_array = np.concatenate((image_array, image), axis=2)
-
-        return image_array
\ No newline at end of file
+    # The model input is built from a history of frames
+    temporal = True
+
+    def __init__(self):
+        self.history = FrameHistory()
+
+    def preprocess(self, frame):
+        self.push(frame)
+        return self.get_input()
+
+    def push(self, frame):
+        """Add a frame to the history without building the model input"""
+        # 32x24 grayscale thumbnail thresholded at 2 to 0-1, shared with the other thumbnail detectors
+        image = frame.get_mask(2)
+
+        fill_convex_hull(image, self.history.next_slot())
+        self.history.commit()
+
+    def reset(self):
+        self.history.reset()
+
+    def is_ready(self):
+        """False until the history has filled up again"""
+        return self.history.is_full()
+
+    def get_input(self):
+        """Model input made of every second frame of the history, (1, 24, 320) float32"""
+        return self.history.get_input()
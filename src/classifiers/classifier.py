@@ -1,18 +1,34 @@
 import numpy as np
 import onnxruntime
 import logging
-import time
 import os
 
+from src.tracing import tracer
+
 
 class Classifier:
-    def __init__(self, model_path, preprocessing, opts, threshold):
+    def __init__(self, model_path, preprocessing, opts, threshold, gate=None):
         self.model = self.load_model(model_path, opts)
         self.preprocessing = preprocessing
         self.threshold = threshold
+        # Optional cheap check that tells when the model can only answer "no load"
+        self.gate = gate
+        self.trace_name = type(preprocessing).__name__
 
         self.count = 0
-        self.prev_update = time.time()
+        self.prev_update = None
+        # Last frame given to the preprocessor and gate, which may happen before update() is called
+        self.observed_seq = None
+        self.gate_open = True
+        # Capture time of the first frame in the current run of positive predictions
+        self.positive_since = None
+
+        # Prediction reused for duplicate frames, at most max_reuse times in a row. Only the temporal
+        # classifiers reuse it, the duplicate check compares exactly the thumbnail they read, while the
+        # strip classifiers read full resolution regions it barely samples
+        self.prev_pred = None
+        self.reused = 0
+        self.max_reuse = 1
 
     @staticmethod
     def load_model(model_path, opts):
@@ -43,25 +59,53 @@ class Classifier:
             return None
 
     def update(self, frame):
-        # Reset after 1 second of inactivity
-        if time.time() - self.prev_update > 1:
+        # Reset after 1 second of inactivity, measured in capture time
+        if self.prev_update is not None and frame.timestamp - self.prev_update > 1:
             self.count = 0
-        self.prev_update = time.time()
+            self.positive_since = None
+        self.prev_update = frame.timestamp
 
         if self.model is None:
             return False
 
         try:
-            frame_prep = self.preprocessing.preprocess(frame)
-            inputs = {self.model.get_inputs()[0].name: np.expand_dims(frame_prep, axis=0).astype('float32')}
-            pred = np.argmax(self.model.run(None, inputs)[0], axis=1)[0]
+            # Always observe so the frame history keeps advancing in capture time
+            self.observe(frame)
+
+            if not self.gate_open or (self.preprocessing.temporal and not self.preprocessing.is_ready()):
+                # Nothing but bright gameplay in the model's input, or a history still filling up with
+                # an all black, load like picture in place of the frames it doesn't have yet
+                pred = 0
+                self.prev_pred = pred
+                self.reused = 0
+            elif (frame.duplicate and self.preprocessing.temporal and self.prev_pred is not None and
+                  self.reused < self.max_reuse):
+                # Same picture as last frame, so the model would give the same answer
+                pred = self.prev_pred
+                self.reused += 1
+            else:
+                with tracer.span(self.trace_name + ".preprocess"):
+                    if self.preprocessing.temporal:
+                        frame_prep = self.preprocessing.get_input()
+                    else:
+                        frame_prep = self.preprocessing.preprocess(frame)
+
+                inputs = {self.model.get_inputs()[0].name: np.expand_dims(frame_prep, axis=0).astype(np.float32, copy=False)}
+                with tracer.span(self.trace_name + ".model.run"):
+                    output = self.model.run(None, inputs)
+                pred = np.argmax(output[0], axis=1)[0]
+                self.prev_pred = pred
+                self.reused = 0
 
             if pred == 1:
+                if self.positive_since is None:
+                    self.positive_since = frame.timestamp
                 if self.count < 0:
                     self.count = 0
                 else:
                     self.count += 1
             else:
+                self.positive_since = None
                 if self.count > 0:
                     self.count = 0
                 else:
@@ -73,6 +117,32 @@ class Classifier:
             logging.error(f"Error in classifier update: {e}")
             return False
 
+    def observe(self, frame):
+        """Feed a frame to the preprocessor's history and the gate without running the model"""
+        if frame.seq == self.observed_seq:
+            return
+        self.observed_seq = frame.seq
+
+        if self.preprocessing.temporal:
+            with tracer.span(self.trace_name + ".push"):
+                self.preprocessing.push(frame)
+        self.gate_open = self.gate is None or self.gate.update(frame)
+
+    def reset(self):
+        """Forget the frame history, gate and predictions, like a classifier that has never seen a frame"""
+        self.count = 0
+        self.prev_update = None
+        self.observed_seq = None
+        self.gate_open = True
+        self.positive_since = None
+        self.prev_pred = None
+        self.reused = 0
+
+        if self.preprocessing.temporal:
+            self.preprocessing.reset()
+        if self.gate is not None:
+            self.gate.reset()
+
     def check_reset(self):
         return self.count <= -self.threshold
 
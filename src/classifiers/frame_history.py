@@ -0,0 +1,47 @@
+import numpy as np
+
+
+class FrameHistory:
+    """Ring of the last binarized 32x24 frames that the temporal models' input is built from"""
+    def __init__(self, length=19, shape=(24, 32)):
+        self.length = length
+        self.shape = shape
+        self.frames = np.zeros((length,) + shape, np.uint8)
+        self.count = 0
+        self.index = 0  # slot the next frame goes in, the oldest frame once the ring is full
+
+        # The model sees the oldest frame and then every second frame after it, oldest first
+        offsets = np.asarray([0] + list(range(1, length, 2)))
+        self.indices = [(offsets + start) % length for start in range(length)]
+        self.selected = np.zeros((len(offsets),) + shape, np.uint8)
+
+        # (1, 24, 320) input reused for every prediction
+        self.output = np.zeros((1, shape[0], shape[1] * len(offsets)), np.float32)
+        self.empty = np.zeros_like(self.output)
+
+    def next_slot(self):
+        """Array to write the next frame into as 0s and 1s, added to the history by commit()"""
+        return self.frames[self.index]
+
+    def commit(self):
+        self.index = (self.index + 1) % self.length
+        self.count = min(self.count + 1, self.length)
+
+    def is_full(self):
+        return self.count >= self.length
+
+    def reset(self):
+        """Forget every frame, the input is zeros again until the history has filled up"""
+        self.count = 0
+        self.index = 0
+
+    def get_input(self):
+        """Selected frames side by side as float32, zeros until the history is full"""
+        if not self.is_full():
+            return self.empty
+
+        np.take(self.frames, self.indices[self.index], axis=0, out=self.selected, mode="clip")
+        # (10, 24, 32) frames written as (24, 10, 32) into the (24, 320) image
+        np.copyto(self.output[0].reshape(self.shape[0], len(self.selected), self.shape[1]),
+                  self.selected.transpose(1, 0, 2))
+        return self.output
@@ -1,33 +1,5 @@
-import numpy as np
-import cv2
+from src.classifiers.strip_preprocessor import StripPreprocessor
 
-lut = np.asarray([
-    0, 1, 3, 4, 5, 6, 8, 9, 10, 11, 13, 14, 15, 17, 18, 19, 20, 22, 23, 24,  # 20
-    26, 27, 28, 29, 31, 32, 33, 34, 36, 37, 38, 40, 41, 42, 43, 45, 46, 47, 48, 50,  # 40
-    51, 52, 54, 55, 56, 57, 59, 60, 61, 62, 64, 65, 66, 68, 69, 70, 71, 73, 74, 75,  # 60
-    77, 78, 79, 80, 82, 83, 84, 85, 87, 88, 89, 91, 92, 93, 94, 96, 97, 98, 99, 101,  # 80
-    102, 103, 105, 106, 107, 108, 110, 111, 112, 113, 115, 116, 117, 119, 120, 121, 122, 124, 125, 126,  # 100
-    128, 129, 130, 131, 133, 134, 135, 136, 138, 139, 140, 142, 143, 144, 145, 147, 148, 149, 150, 152,  # 120
-    153, 154, 156, 157, 158, 159, 161, 162, 163, 164, 166, 167, 168, 170, 171, 172, 173, 175, 176, 177,  # 140
-    179, 180, 181, 182, 184, 185, 186, 187, 189, 190, 191, 193, 194, 195, 196, 198, 199, 200, 201, 203,  # 160
-    204, 205, 207, 208, 209, 210, 212, 213, 214, 215, 217, 218, 219, 221, 222, 223, 224, 226, 227, 228,  # 180
-    230, 231, 232, 233, 235, 236, 237, 238, 240, 241, 242, 244, 245, 246, 247, 249, 250, 251, 252, 254,  # 200
-    255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255,  # 220
-    255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255,  # 240
-    255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255])  # 256
 
-
-class GhostHousePreprocessor:
-    def preprocess(self, image):
-        # Crop
-        image = image[351:351 + 36, 90:90 + 324]
-        # Resize
-        image = cv2.resize(image, (0, 0), fx=0.3, fy=0.3, interpolation=cv2.INTER_NEAREST)
-        # Apply LUT
-        image = cv2.LUT(image, lut).astype('uint8')
-        # Rescale 0-255 to 0-1
-        image = image / 255
-        # Rearrange array dimensions (11, 97, 3) to (3, 11, 97)
-        image = image.transpose((2, 0, 1))
-
-        return image
\ No newline at end of file
+class GhostHousePreprocessor(StripPreprocessor):
+    """Bottom strip input of the ghost house classifier"""
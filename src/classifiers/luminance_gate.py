@@ -0,0 +1,31 @@
+class LuminanceGate:
+    """Skips a temporal classifier's model while none of the frames in its input come close to a load screen"""
+    def __init__(self, black_level, window=19):
+        # Gray level the classifier's preprocessor thresholds at, and how far above it still counts as near
+        self.black_level = black_level
+        self.margin = 16
+        # Frames with less than this share of near black pixels and this bright on average are plain gameplay
+        self.dark_fraction = 0.1
+        self.mean_level = 40
+        # Frames in the classifier's input history
+        self.window = window
+
+        self.frames_since_dark = 0
+        self.skipped_frames = 0
+
+    def update(self, frame):
+        """Add a frame to the history, False while the model can't see anything but gameplay"""
+        dark = frame.get_dark_count(self.black_level + self.margin)
+
+        if dark >= self.dark_fraction * frame.get_gray_thumbnail().size or frame.get_thumbnail_mean() < self.mean_level:
+            self.frames_since_dark = 0
+        else:
+            self.frames_since_dark += 1
+
+        if self.frames_since_dark >= self.window:
+            self.skipped_frames += 1
+            return False
+        return True
+
+    def reset(self):
+        self.frames_since_dark = 0
@@ -0,0 +1,120 @@
+import argparse
+import logging
+import os
+import sys
+
+from src.config import Config
+from src.engine import Engine
+from src.route import load_route_file
+from src.tracing import tracer
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="Run NSMBW AutoSplit without a window")
+    parser.add_argument("route", help=".nsmbw route or LiveSplit .lss splits to follow")
+    parser.add_argument("--source", help="capture device index, recorded video file or directory of frames "
+                                         "(default: the configured capture device)")
+    parser.add_argument("--port", type=int, help="LiveSplit Server port (default: the configured port)")
+    parser.add_argument("--starting-detector", choices=["manual", "switch"])
+    parser.add_argument("--ending-detector", choices=["manual", "switch"])
+    parser.add_argument("--trace", help="write a Chrome trace of the detection pipeline to this file")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    return parser.parse_args(args)
+
+
+class ConsoleReporter:
+    """Prints the engine events the main window would show"""
+    def __init__(self, engine):
+        self.engine = engine
+        self.prev_status = None
+        self.prev_connected = None
+
+        engine.on("status_update", self.status_update)
+        engine.on("load_count_changed", self.load_count_changed)
+        engine.on("next_split", self.split_changed)
+        engine.on("prev_split", self.split_changed)
+        engine.on("reset_splits", self.reset_splits)
+        engine.on("livesplit_status", self.livesplit_status)
+
+    def status_update(self, message, busy, waiting):
+        # Status is sent with every frame, only print changes
+        if message != self.prev_status:
+            self.prev_status = message
+            print(f"Status: {message}")
+
+    def load_count_changed(self, load_count, expected_loads):
+        print(f"Loads: {load_count}/{expected_loads}")
+
+    def split_changed(self):
+        route = self.engine.route
+        index = self.engine.current_split_index
+        if route is not None and 0 <= index < len(route.splits):
+            print(f"Split {index + 1}/{len(route.splits)}: {route.splits[index].name}")
+
+    def reset_splits(self):
+        print("Splits reset")
+
+    def livesplit_status(self, connected):
+        # Reported after every connection attempt
+        if connected != self.prev_connected:
+            self.prev_connected = connected
+            print("LiveSplit connected" if connected else "LiveSplit disconnected")
+
+
+def main(args=None):
+    args = parse_args(args)
+
+    # Resolve paths before moving to the install directory, where models and defaults.json are found
+    route_path = os.path.abspath(args.route)
+    source = args.source
+    if source is not None and not source.isdigit():
+        source = os.path.abspath(source)
+    trace_path = os.path.abspath(args.trace) if args.trace else None
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(filename)s:%(lineno)d - %(message)s",
+                        level=getattr(logging, args.log_level))
+    Config.init()
+
+    route = load_route_file(route_path)
+    if route is None:
+        print(f"Couldn't load route \"{route_path}\"")
+        return 1
+
+    if trace_path is not None:
+        tracer.start(trace_path)
+
+    engine = Engine()
+    ConsoleReporter(engine)
+
+    if args.port is not None:
+        engine.livesplit.port = args.port
+    if args.starting_detector is not None:
+        engine.starting_detector = args.starting_detector
+    if args.ending_detector is not None:
+        engine.ending_detector = args.ending_detector
+
+    if source is None:
+        source = Config.get_key("capture_device", 0)
+    if not engine.open_capture(source):
+        print(f"Couldn't open capture source \"{source}\"")
+        engine.quit()
+        tracer.stop()
+        return 1
+
+    engine.set_route(route)
+    engine.set_running(True)
+
+    try:
+        engine.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.quit()
+        tracer.stop()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
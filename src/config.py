@@ -4,7 +4,9 @@ import json
 import os
 
 class Config:
-    appdata = os.path.join(os.path.expandvars(r'%LOCALAPPDATA%'), "NSMBW AutoSplit")
+    # %LOCALAPPDATA% on Windows, the XDG data directory on headless Linux capture boxes
+    appdata = os.path.join(os.environ.get("LOCALAPPDATA", os.path.join(os.path.expanduser("~"), ".local", "share")),
+                           "NSMBW AutoSplit")
     config_path = os.path.join(appdata, "config.json")
     default_path = "defaults.json"
     routes_directory = "routes"  # Routes folder in root directory
@@ -67,6 +69,16 @@ class Config:
                 Config.default = {
                     "livesplit_port": 16834,
                     "capture_device": 0,
+                    "replay_realtime": True,
+                    "raw_mjpeg": False,
+                    "v4l2_backend": True,
+                    "skip_duplicate_frames": True,
+                    "luminance_gate": True,
+                    "adaptive_detection": True,
+                    "capture_process": False,
+                    "replay_buffer_seconds": 10,
+                    "replay_buffer_max_mb": 64,
+                    "trace_enabled": False,
                     "show_preview": True,
                     "fullscreen": False,
                     "window_position": [100, 100],
@@ -76,6 +88,7 @@ class Config:
                     "route_splitter_1": [350, 500],
                     "starting_detector": "manual",
                     "ending_detector": "switch",
+                    "correct_game_time": True,
                     "font_size": 9
                 }
                 # Save the default file for future use
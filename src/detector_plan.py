@@ -0,0 +1,74 @@
+import logging
+
+
+# Ghost house and tower/castle classifiers read the full resolution image
+full_frame_load_types = ("ghost_house", "tower_castle")
+
+
+class LoadStep:
+    """Detector and classifier that look for one load, shared by every split that expects that load type"""
+    def __init__(self, load_type, update, check, classifier):
+        self.load_type = load_type
+        self.update = update
+        self.check = check
+        self.classifier = classifier
+        self.full_frame = load_type in full_frame_load_types
+
+    def detect(self, frame):
+        """Feed a frame to the detector, True once it has found the load"""
+        self.update(frame)
+        return self.check()
+
+    def get_load_start(self, frame, load_entry_detector=None):
+        """Capture time the screen went dark for the load, or of the first frame the classifier saw it in"""
+        start = frame.timestamp
+        if self.classifier is not None and self.classifier.positive_since is not None:
+            start = self.classifier.positive_since
+        # The classifier is only sure of a load some frames into it, the dark onset is where it started
+        if load_entry_detector is not None:
+            dark_since = load_entry_detector.get_load_start(start)
+            if dark_since is not None:
+                return dark_since
+        return start
+
+
+class SplitPlan:
+    """Load steps of one split in order and what happens after its final load"""
+    def __init__(self, split, load_steps):
+        self.name = split.name
+        # Extra loads, like ones carried over from a split that doesn't reset the count, use the last step
+        self.load_steps = load_steps
+        self.expected_loads = split.expected_loads
+        self.split = split.split
+        # Captured frames to wait after the final load so the fade in has finished before splitting
+        self.split_delay = 10
+
+    def get_load_step(self, load_count):
+        if not self.load_steps:
+            return None
+        return self.load_steps[min(load_count, len(self.load_steps) - 1)]
+
+
+def get_split_load_types(split):
+    """Load type of each load in a split, the first load of a level is a banner load unless the route says otherwise"""
+    if split.load_types:
+        return list(split.load_types)
+    return ["banner_load"] + [split.load_type] * max(split.expected_loads - 1, 1)
+
+
+def compile_route(route, load_steps):
+    """Turn a route into a list of split plans, one per split, using the load steps by load type"""
+    plan = []
+    if route is None:
+        return plan
+
+    for split in route.splits:
+        steps = []
+        for load_type in get_split_load_types(split):
+            step = load_steps.get(load_type)
+            if step is None:
+                logging.warning(f"Unknown load type \"{load_type}\" in split \"{split.name}\", the load won't be detected")
+            steps.append(step)
+        plan.append(SplitPlan(split, steps))
+
+    return plan
@@ -1,10 +1,11 @@
 import numpy as np
-import time
 import cv2
 import onnxruntime
 
 from src.classifiers.classifier import Classifier
 from src.classifiers.banner_load_preprocessor import BannerLoadPreprocessor
+from src.classifiers.luminance_gate import LuminanceGate
+from src.config import Config
 
 
 class BannerLoadDetector:
@@ -19,19 +20,21 @@ class BannerLoadDetector:
         self.banner_thresh = 5
         self.banner_detected = False
         self.banner_checked = False
-        self.last_detection_time = 0
+        self.last_detection_time = None
         self.detection_cooldown = 2.0
 
     def load_model(self, opts):
         """Load the banner load ONNX model"""
-        self.banner_classifier = Classifier(self.banner_model_path, BannerLoadPreprocessor(), opts, self.banner_thresh)
+        # The banner preprocessor thresholds at 2
+        gate = LuminanceGate(2) if Config.get_key("luminance_gate", True) else None
+        self.banner_classifier = Classifier(self.banner_model_path, BannerLoadPreprocessor(), opts, self.banner_thresh, gate)
 
     def update(self, frame):
         """Update banner detection state"""
-        current_time = time.time()
+        current_time = frame.timestamp
         
         # Cooldown to prevent multiple detections
-        if current_time - self.last_detection_time < self.detection_cooldown:
+        if self.last_detection_time is not None and current_time - self.last_detection_time < self.detection_cooldown:
             return False
 
         if self.banner_classifier and self.banner_classifier.update(frame):
@@ -59,4 +62,4 @@ class BannerLoadDetector:
         """Reset detector state"""
         self.banner_detected = False
         self.banner_checked = False
-        self.last_detection_time = 0
\ No newline at end of file
+        self.last_detection_time = None
\ No newline at end of file
@@ -1,5 +1,4 @@
 import numpy as np
-import time
 import cv2
 import onnxruntime
 
@@ -7,6 +6,8 @@ from src.classifiers.classifier import Classifier
 from src.classifiers.fade_load_preprocessor import FadeLoadPreprocessor
 from src.classifiers.ghost_house_preprocessor import GhostHousePreprocessor
 from src.classifiers.tower_castle_preprocessor import TowerCastlePreprocessor
+from src.classifiers.luminance_gate import LuminanceGate
+from src.config import Config
 
 
 class FadeLoadDetector:
@@ -28,30 +29,37 @@ class FadeLoadDetector:
         self.fade_checked = False
         self.current_load_type = "regular_fade"
         
-        self.last_detection_time = 0
+        self.last_detection_time = None
         self.detection_cooldown = 2.0
 
     def load_models(self, opts):
         """Load all fade load ONNX models"""
-        self.fade_classifier = Classifier(self.fade_model_path, FadeLoadPreprocessor(), opts, self.fade_thresh)
+        # The fade preprocessor thresholds at 1, the strip classifiers don't look at black levels
+        gate = LuminanceGate(1) if Config.get_key("luminance_gate", True) else None
+        self.fade_classifier = Classifier(self.fade_model_path, FadeLoadPreprocessor(), opts, self.fade_thresh, gate)
         self.ghost_house_classifier = Classifier(self.fade_model_path, GhostHousePreprocessor(), opts, self.ghost_house_thresh)
         self.tower_castle_classifier = Classifier(self.fade_model_path, TowerCastlePreprocessor(), opts, self.tower_castle_thresh)
 
-    def update(self, frame, load_type="regular_fade"):
+    def get_classifier(self, load_type):
+        """Classifier for a load type, regular fades are also used when a model is missing"""
+        if load_type == "ghost_house" and self.ghost_house_classifier:
+            return self.ghost_house_classifier
+        elif load_type == "tower_castle" and self.tower_castle_classifier:
+            return self.tower_castle_classifier
+        return self.fade_classifier
+
+    def update(self, frame, load_type="regular_fade", classifier=None):
         """Update fade detection state based on load type"""
-        current_time = time.time()
+        current_time = frame.timestamp
         self.current_load_type = load_type
         
         # Cooldown to prevent multiple detections
-        if current_time - self.last_detection_time < self.detection_cooldown:
+        if self.last_detection_time is not None and current_time - self.last_detection_time < self.detection_cooldown:
             return False
 
-        # Select appropriate classifier based on load type
-        classifier = self.fade_classifier
-        if load_type == "ghost_house" and self.ghost_house_classifier:
-            classifier = self.ghost_house_classifier
-        elif load_type == "tower_castle" and self.tower_castle_classifier:
-            classifier = self.tower_castle_classifier
+        # Detector plans pass the classifier they selected when the route was loaded
+        if classifier is None:
+            classifier = self.get_classifier(load_type)
 
         if classifier and classifier.update(frame):
             self.fade_detected = True
@@ -78,5 +86,5 @@ class FadeLoadDetector:
         """Reset detector state"""
         self.fade_detected = False
         self.fade_checked = False
-        self.last_detection_time = 0
+        self.last_detection_time = None
         self.current_load_type = "regular_fade"
\ No newline at end of file
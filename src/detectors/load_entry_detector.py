@@ -0,0 +1,33 @@
+class LoadEntryDetector:
+    """Watches the 32x24 thumbnail for the screen going dark, the start of a load before any classifier is sure of it"""
+    def __init__(self):
+        # Same black level and shares as LoadExitDetector so a load is measured between the same two pictures
+        self.black_level = 2
+        self.dark_fraction = 0.6
+        self.bright_fraction = 0.4
+        # Longest a dark onset may come before the classifier's first positive frame and still start the load,
+        # an older one is a dark part of a level rather than the load's fade out
+        self.max_lead = 1.0
+
+        self.dark_since = None
+
+    def update(self, frame):
+        """Check a frame, returns the capture time the screen went dark or None while it isn't"""
+        black = frame.get_dark_count(self.black_level) / frame.get_gray_thumbnail().size
+
+        if black >= self.dark_fraction:
+            if self.dark_since is None:
+                self.dark_since = frame.timestamp
+        elif black < self.bright_fraction:
+            self.dark_since = None
+
+        return self.dark_since
+
+    def get_load_start(self, positive_since):
+        """Dark onset of a load the classifier first saw at positive_since, None if the screen didn't go dark"""
+        if self.dark_since is None or positive_since - self.dark_since > self.max_lead:
+            return None
+        return self.dark_since
+
+    def reset(self):
+        self.dark_since = None
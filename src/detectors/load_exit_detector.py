@@ -0,0 +1,46 @@
+class LoadExitDetector:
+    """Watches the 32x24 thumbnail during a load for the picture coming back"""
+    def __init__(self):
+        # Gray level the load preprocessors treat as black
+        self.black_level = 2
+        # Share of black pixels that counts as the load screen, banners cover less than a third of it
+        self.dark_fraction = 0.6
+        # Share of black pixels below which the picture is back
+        self.bright_fraction = 0.4
+        # Bright frames in a row needed to end the load, so a flash on the load screen doesn't
+        self.confirm_frames = 2
+
+        self.load_start_time = None
+        self.seen_dark = False
+        self.bright_count = 0
+        self.bright_since = None
+
+    def update(self, frame, load_start_time):
+        """Check a frame of the load that started at load_start_time, True once the picture has returned"""
+        # A new load starts from the fade out again
+        if load_start_time != self.load_start_time:
+            self.reset()
+            self.load_start_time = load_start_time
+
+        black = frame.get_dark_count(self.black_level) / frame.get_gray_thumbnail().size
+
+        # Loads are confirmed while the screen may still be fading out
+        if not self.seen_dark:
+            self.seen_dark = black >= self.dark_fraction
+            return False
+
+        if black < self.bright_fraction:
+            if self.bright_count == 0:
+                self.bright_since = frame.timestamp
+            self.bright_count += 1
+        else:
+            self.bright_count = 0
+            self.bright_since = None
+
+        return self.bright_count >= self.confirm_frames
+
+    def reset(self):
+        self.load_start_time = None
+        self.seen_dark = False
+        self.bright_count = 0
+        self.bright_since = None
@@ -1,4 +1,5 @@
 import numpy as np
+import cv2
 
 class SwitchDetector:
     def __init__(self):
@@ -6,6 +7,12 @@ class SwitchDetector:
         self.prev_switch_pixel_count = 0
         self.switch_detected = False
         self.switch_checked = False
+        # Matching frames in a row needed for a hit, so one noisy frame can't split. Frames the reader skipped
+        # don't break the row, but a match older than confirm_time seconds no longer counts
+        self.confirm_frames = 2
+        self.confirm_time = 0.25
+        self.match_count = 0
+        self.last_match_time = None
         
         # Define color thresholds for switch detection
         self.white_threshold = np.array([245, 245, 243])
@@ -16,34 +23,51 @@ class SwitchDetector:
         self.roi_x1, self.roi_y1 = 494, 278  # Top-left corner
         self.roi_x2, self.roi_y2 = 582, 296  # Bottom-right corner
 
+        # Inclusive (lower, upper) bounds of each color for cv2.inRange, white has no upper bound
+        self.color_ranges = [
+            (tuple(map(int, self.white_threshold - 10)), (255, 255, 255)),
+            (tuple(map(int, self.pale_blue_threshold - 10)), tuple(map(int, self.pale_blue_threshold + 10))),
+            (tuple(map(int, self.light_cyan_threshold - 10)), tuple(map(int, self.light_cyan_threshold + 10))),
+        ]
+        # Mask reused for every color
+        self.mask = np.zeros((self.roi_y2 - self.roi_y1, self.roi_x2 - self.roi_x1), np.uint8)
+
     def update(self, frame):
         """Update switch detection state"""
+        # Every frame is checked, duplicates included, the duplicate check only compares the 32x24
+        # thumbnail and that barely samples the switch
+
         # Reset detection state
         self.switch_detected = False
         
         # Extract the region of interest
-        frame_crop = frame[self.roi_y1:self.roi_y2, self.roi_x1:self.roi_x2]
+        frame_crop = frame.get_feature("switch_roi", self.get_roi)
         
         if frame_crop.size == 0:
             return False
 
-        # Count pixels matching our color criteria
-        white_pixels = np.sum(np.all(frame_crop >= self.white_threshold - 10, axis=2))
-        pale_blue_pixels = np.sum(np.all((frame_crop >= self.pale_blue_threshold - 10) & 
-                                        (frame_crop <= self.pale_blue_threshold + 10), axis=2))
-        light_cyan_pixels = np.sum(np.all((frame_crop >= self.light_cyan_threshold - 10) & 
-                                         (frame_crop <= self.light_cyan_threshold + 10), axis=2))
+        # Count pixels matching our color criteria, a pixel in two ranges counts twice
+        total_matching_pixels = 0
+        for lower, upper in self.color_ranges:
+            cv2.inRange(frame_crop, lower, upper, dst=self.mask)
+            total_matching_pixels += cv2.countNonZero(self.mask)
         
-        total_matching_pixels = white_pixels + pale_blue_pixels + light_cyan_pixels
         total_pixels = frame_crop.shape[0] * frame_crop.shape[1]
         
         # Require majority of pixels to match our color criteria
         if total_matching_pixels > total_pixels * 0.6:  # 60% threshold
             self.switch_pixels = total_matching_pixels
-            self.switch_detected = True
+            recent = self.last_match_time is not None and frame.timestamp - self.last_match_time <= self.confirm_time
+            self.match_count = self.match_count + 1 if recent else 1
+            self.last_match_time = frame.timestamp
         else:
             self.switch_pixels = 0
-            self.switch_detected = False
+            self.match_count = 0
+
+        self.switch_detected = self.match_count >= self.confirm_frames
+
+    def get_roi(self, frame):
+        return frame.get_image()[self.roi_y1:self.roi_y2, self.roi_x1:self.roi_x2]
 
     def check_switch_hit(self):
         """Check if switch was hit"""
@@ -58,4 +82,6 @@ class SwitchDetector:
         self.switch_pixels = 0
         self.prev_switch_pixel_count = 0
         self.switch_detected = False
-        self.switch_checked = False
\ No newline at end of file
+        self.switch_checked = False
+        self.match_count = 0
+        self.last_match_time = None
\ No newline at end of file
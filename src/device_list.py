@@ -0,0 +1,27 @@
+import logging
+
+from PyQt5.QtMultimedia import QCameraInfo
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class DeviceListWorker(QThread):
+    sig_device_list_updated = pyqtSignal(dict)
+
+    def __init__(self):
+        QThread.__init__(self)
+
+        self.device_list = {}
+
+    def run(self):
+        self.update_device_list()
+        self.sig_device_list_updated.emit(self.device_list)
+
+    def update_device_list(self):
+        try:
+            self.device_list.clear()
+            index = 0
+            for camera_info in QCameraInfo.availableCameras():
+                self.device_list[str(index)] = camera_info.description()
+                index += 1
+        except Exception as e:
+            logging.exception(e)
\ No newline at end of file
@@ -0,0 +1,869 @@
+import datetime
+import functools
+import logging
+import os
+import threading
+import time
+import onnxruntime
+
+from src.livesplit import Livesplit
+from src.vid_capture import VideoCapture
+from src.pipeline import StageQueue, CaptureQueue, Stage, Pipeline
+from src.scheduler import DetectionScheduler
+from src.config import Config
+from src.tracing import tracer
+from src.detector_plan import LoadStep, compile_route
+from src.detectors.banner_load_detector import BannerLoadDetector
+from src.detectors.fade_load_detector import FadeLoadDetector
+from src.detectors.switch_detector import SwitchDetector
+from src.detectors.load_entry_detector import LoadEntryDetector
+from src.detectors.load_exit_detector import LoadExitDetector
+
+
+class Engine:
+    """Autosplitter core that reports to the UI or command line only through event callbacks"""
+    def __init__(self, livesplit=None):
+        self.alive = True
+        self.running = False
+        self.route = None
+        self.show_preview = Config.get_key("show_preview", True)
+
+        # Event name -> callbacks, run on the action stage unless noted otherwise
+        self.listeners = {}
+
+        # Frames go from capture through feature extraction and inference to the split state machine,
+        # whose LiveSplit commands and UI updates are sent by the action stage
+        self.pipeline = None
+        self.inference_queue = None
+        self.state_queue = None
+        self.action_queue = None
+        self.wake_event = threading.Event()
+        self.stats_interval = 10.0
+
+        # Detectors the inference stage runs, published by the state machine after every frame
+        self.detector_plan = {"switch": False, "load_step": None, "last_load_time": None, "load_exit": None,
+                              "mode": "full"}
+        self.detectors_reset = threading.Event()
+        # Mode of the previous frame the inference stage saw
+        self.prev_detection_mode = "full"
+
+        # Fewer frames get full resolution detection while no load or split is likely
+        self.scheduler = DetectionScheduler() if Config.get_key("adaptive_detection", True) else None
+        self.split_time = None  # capture time of the last split
+        self.last_frame_time = None
+
+        self.video_capture = VideoCapture()
+
+        # Initialize detectors with ONNX session options
+        opts = onnxruntime.SessionOptions()
+        opts.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        
+        self.banner_detector = BannerLoadDetector()
+        self.banner_detector.load_model(opts)
+        
+        self.fade_detector = FadeLoadDetector()
+        self.fade_detector.load_models(opts)
+        
+        self.switch_detector = SwitchDetector()
+        self.load_entry_detector = LoadEntryDetector()
+        self.load_exit_detector = LoadExitDetector()
+
+        # One load step per load type, the route is compiled into a list of them per split
+        fade = self.fade_detector
+        self.load_steps = {
+            "banner_load": LoadStep("banner_load", self.banner_detector.update, self.banner_detector.check_banner_load,
+                                    self.banner_detector.banner_classifier),
+        }
+        for load_type in ("regular_fade", "tower_castle", "ghost_house"):
+            classifier = fade.get_classifier(load_type)
+            self.load_steps[load_type] = LoadStep(load_type, functools.partial(fade.update, load_type=load_type,
+                                                                               classifier=classifier),
+                                                  fade.check_fade_load, classifier)
+        self.route_plan = []
+
+        # Frame histories of every temporal classifier are kept current whichever load type is active,
+        # so switching load type needs no warm up
+        self.history_classifiers = [classifier for classifier in (self.banner_detector.banner_classifier,
+                                                                  fade.fade_classifier)
+                                    if classifier is not None and classifier.preprocessing.temporal]
+
+        # Anything with the same commands can stand in for the LiveSplit Server connection
+        self.livesplit = livesplit
+        if self.livesplit is None:
+            self.livesplit = Livesplit()
+            self.livesplit.on_connection_status = self.livesplit_status_changed
+            self.livesplit.on_timer_reset = self.request_reset_run
+            self.livesplit.start()
+
+        self.current_split_index = 0
+        self.current_split = None
+        self.current_component_index = 0
+        self.prev_component = None
+
+        self.current_component = None
+        self.load_count = 0
+        self.activations = 0
+        self.run_started = False
+        self.wait_for_first_split = False
+        self.wait_for_reset = False
+        self.waiting_for_fadein = False
+        
+        # Load detection state variables
+        self.is_in_load_state = False
+        self.last_load_time = None  # capture time of the last detected load
+        self.load_cooldown = 2.0  # seconds between load detections
+        self.max_load_time = 10.0  # seconds after which a load whose end wasn't seen is ended anyway
+        self.current_load_type = None
+        self.split_at_seq = 0
+
+        # Capture time the current load started and total load time of the run, in seconds
+        self.load_start_time = None
+        self.loading_time = 0.0
+        # Game time is corrected with the measured load lengths instead of when pause and resume arrive
+        self.correct_game_time = Config.get_key("correct_game_time", True)
+        
+        # Detector settings
+        self.starting_detector = Config.get_key("starting_detector", "manual")
+        self.ending_detector = Config.get_key("ending_detector", "switch")
+
+    def run(self):
+        self.initialize()
+
+        while self.alive:
+            if self.running and self.pipeline is None:
+                self.start_pipeline()
+            elif not self.running and self.pipeline is not None:
+                self.stop_pipeline()
+
+            # Sleep until started or stopped, logging how each stage keeps up in between
+            if self.wake_event.wait(self.stats_interval):
+                self.wake_event.clear()
+            elif self.pipeline is not None:
+                logging.info(f"Pipeline stats: {self.pipeline.format_stats()}")
+
+        self.stop_pipeline()
+
+    def start_pipeline(self):
+        # Frames that reach inference are never dropped so the temporal histories keep their frame spacing,
+        # a slow inference stage holds up the feature stage and the capture reader skips frames instead
+        self.inference_queue = StageQueue(2, block=True)
+        self.state_queue = StageQueue(4)
+        self.action_queue = StageQueue(8)
+
+        self.pipeline = Pipeline([
+            Stage("features", self.extract_features, CaptureQueue(self.video_capture), self.inference_queue),
+            Stage("inference", self.run_detectors, self.inference_queue, self.state_queue, self.is_droppable),
+            Stage("state", self.update_state, self.state_queue),
+            Stage("actions", self.run_action, self.action_queue),
+        ])
+        self.pipeline.start()
+
+    def stop_pipeline(self):
+        if self.pipeline is None:
+            return
+
+        pipeline = self.pipeline
+        self.pipeline = None
+        pipeline.stop()
+
+    def set_running(self, running):
+        """Start or stop the detection pipeline"""
+        self.running = running
+        self.wake_event.set()
+
+    @staticmethod
+    def is_droppable(frame):
+        """Frames carrying a detection are only seen once, so they must reach the state machine"""
+        return not (frame.switch_hit or frame.load_detected or frame.load_end_time is not None)
+
+    def post_control_event(self, callback, *args):
+        """Run an action on the state machine stage so it never races with frame processing"""
+        if self.pipeline is None:
+            callback(*args)
+            self.update_detector_plan()
+        else:
+            self.state_queue.put((callback, args), droppable=False)
+
+    def post_action(self, callback, *args, droppable=False):
+        """Send a LiveSplit command or UI update from the action stage"""
+        if self.pipeline is None:
+            callback(*args)
+        else:
+            self.action_queue.put((callback, args), droppable)
+
+    def run_action(self, action):
+        callback, args = action
+        with tracer.span(callback.__name__):
+            callback(*args)
+
+    def request_skip_split(self):
+        self.post_control_event(self.skip_split)
+
+    def request_undo_split(self):
+        self.post_control_event(self.undo_split)
+
+    def request_reset_run(self):
+        self.post_control_event(self.reset_run)
+
+    def request_set_route(self, route):
+        self.post_control_event(self.set_route, route)
+
+    def quit(self):
+        self.alive = False
+        self.wake_event.set()
+        self.video_capture.release()
+        self.livesplit.stop()
+
+    def on(self, event, callback):
+        """Call back on an event, see emit() calls for the event names and arguments"""
+        self.listeners.setdefault(event, []).append(callback)
+
+    def emit(self, event, *args):
+        for callback in self.listeners.get(event, []):
+            callback(*args)
+
+    def open_capture(self, spec):
+        """Open a capture device index, a recorded video file or a directory of frames"""
+        return self.video_capture.init_capture_device(spec)
+
+    def livesplit_status_changed(self, connected):
+        # Called on the LiveSplit thread
+        self.emit("livesplit_status", connected)
+
+    def set_route(self, route):
+        """Use a new or edited route, the position in it is kept while a run is in progress"""
+        self.route = route
+        self.route_plan = compile_route(route, self.load_steps)
+        self.route_changed()
+
+    def initialize(self):
+        self.emit("status_update", "Initializing NSMBW AutoSplit", False, False)
+        # Load any ONNX models if needed for future CNN implementation
+        self.emit("status_update", "Ready", False, False)
+
+    def set_starting_detector(self, detector):
+        self.starting_detector = detector
+        Config.set_key("starting_detector", detector)
+
+    def set_ending_detector(self, detector):
+        self.ending_detector = detector
+        Config.set_key("ending_detector", detector)
+
+    def extract_features(self, frame):
+        """Feature stage: decode what the detectors and preview share once per frame"""
+        frame.get_gray_thumbnail()
+
+        plan = self.detector_plan
+        if self.scheduler is not None:
+            frame.full_detection = self.scheduler.schedule(frame, plan["mode"])
+            # Nothing keeps a history of frames while idle, so skipped frames can be dropped here
+            if plan["mode"] == "idle" and not frame.full_detection:
+                return None
+
+        show_preview = self.show_preview and "preview_update" in self.listeners and frame.full_detection
+
+        # Frames are only decoded at full resolution when the preview or a detector asks for it
+        load_step = plan["load_step"]
+        keep_image = frame.full_detection and (show_preview or plan["switch"] or (load_step is not None and load_step.full_frame))
+
+        # The next read can overwrite a shared memory frame while later stages still use this one,
+        # its pixels are only copied out when a later stage reads the full resolution image
+        frame.detach(keep_image)
+
+        if show_preview:
+            self.post_action(self.emit, "preview_update", frame.get_image(), droppable=True)
+
+        return frame
+
+    def run_detectors(self, frame):
+        """Inference stage: run the detectors the state machine currently needs on a frame"""
+        if self.detectors_reset.is_set():
+            self.detectors_reset.clear()
+            self.banner_detector.reset()
+            self.fade_detector.reset()
+            self.switch_detector.reset()
+            self.load_entry_detector.reset()
+            self.load_exit_detector.reset()
+
+        plan = self.detector_plan
+
+        # The plan changed since the feature stage let go of the full resolution image
+        if not frame.has_image():
+            frame.full_detection = False
+
+        # Checked on every frame, the load steps take the start of a load from it
+        self.load_entry_detector.update(frame)
+
+        # Checked on every frame of a load, keyed by when the load started
+        if plan["load_exit"] is not None and self.load_exit_detector.update(frame, plan["load_exit"]):
+            frame.load_end_time = self.load_exit_detector.bright_since
+
+        if plan["switch"] and frame.full_detection:
+            with tracer.span("SwitchDetector.update"):
+                self.switch_detector.update(frame)
+            frame.switch_hit = self.switch_detector.check_switch_hit()
+
+        # Idle frames are neither observed nor all seen, so the histories would mix frames from seconds ago
+        # with new ones, they start over instead
+        if self.prev_detection_mode == "idle" and plan["mode"] != "idle":
+            for classifier in self.history_classifiers:
+                classifier.reset()
+        self.prev_detection_mode = plan["mode"]
+
+        # Histories also advance during the cooldown, only the model is held back
+        if plan["mode"] != "idle":
+            for classifier in self.history_classifiers:
+                classifier.observe(frame)
+
+        # Cooldown to prevent multiple detections
+        load_step = plan["load_step"]
+        last_load_time = plan["last_load_time"]
+        if load_step is None or (last_load_time is not None and frame.timestamp - last_load_time < self.load_cooldown):
+            return frame
+
+        # Temporal classifiers see every frame so their histories keep a fixed frame spacing,
+        # the single frame strip classifiers only see the scheduled ones
+        if load_step.full_frame and not frame.full_detection:
+            return frame
+
+        with tracer.span(load_step.load_type):
+            if load_step.detect(frame):
+                frame.load_detected = load_step.load_type
+                frame.load_start_time = load_step.get_load_start(frame, self.load_entry_detector)
+
+        return frame
+
+    def update_state(self, item):
+        """State machine stage: advance the run from detector results or run a control event"""
+        if isinstance(item, tuple):
+            callback, args = item
+            callback(*args)
+            self.update_detector_plan()
+            return None
+
+        frame = item
+        self.last_frame_time = frame.timestamp
+        # Called on the state stage for every processed frame
+        self.emit("frame_processed", frame)
+
+        try:
+            with tracer.span("update"):
+                self.update(frame)
+        except Exception as e:
+            logging.exception(f"Error in update loop: {e}")
+        finally:
+            if self.video_capture.replay_buffer is not None:
+                self.video_capture.replay_buffer.annotate(frame.seq, self.get_detector_state(frame))
+
+        self.update_detector_plan()
+        return None
+
+    def update_detector_plan(self):
+        """Publish which detectors the inference stage has to run for the current state"""
+        switch = False
+        load_step = None
+        pre_run = not self.run_started and not self.wait_for_first_split
+
+        route = self.route
+        if route is not None and route.splits and self.livesplit.connected:
+            if not (pre_run and self.wait_for_reset):
+                if pre_run and self.starting_detector == "switch":
+                    switch = True
+
+                # Loads are only looked for once the run or the wait for its first split has started
+                if not pre_run and self.current_component is not None:
+                    # The switch is only checked on the last split
+                    if self.current_split_index == len(route.splits) - 1 and self.ending_detector == "switch":
+                        switch = True
+
+                    split_plan = self.get_split_plan()
+                    if split_plan is not None:
+                        load_step = split_plan.get_load_step(self.load_count)
+
+        # A load left over from a finished or stopped run isn't watched, update() ignores it until the next run
+        load_exit = self.load_start_time if self.is_in_load_state and not pre_run else None
+        self.detector_plan = {"switch": switch, "load_step": load_step, "last_load_time": self.last_load_time,
+                              "load_exit": load_exit,
+                              "mode": self.get_detection_mode(switch, load_step, load_exit, pre_run)}
+
+    def get_detection_mode(self, switch, load_step, load_exit, pre_run=False):
+        """Full rate around loads, splits and switch checks, reduced while playing, idle when nothing is detected"""
+        # Waiting for a reset or for a start no detector looks for, whatever state the last run left behind
+        if self.wait_for_reset or (pre_run and not switch):
+            return "idle"
+        if switch or load_exit is not None or self.waiting_for_fadein:
+            return "full"
+        if load_step is None:
+            return "idle"
+
+        # The final load of a split ends it, so don't risk being late for it
+        split_plan = self.get_split_plan()
+        if split_plan is not None and self.load_count >= split_plan.expected_loads - 1:
+            return "full"
+
+        # A new level's banner load usually follows a split closely
+        if (self.split_time is not None and self.last_frame_time is not None and
+                self.last_frame_time - self.split_time < self.load_cooldown):
+            return "full"
+
+        return "reduced"
+
+    def get_split_plan(self):
+        """Compiled plan of the current split, None outside the route"""
+        if 0 <= self.current_split_index < len(self.route_plan):
+            return self.route_plan[self.current_split_index]
+        return None
+
+    def update(self, frame):
+        if self.current_component != self.prev_component:
+            self.set_activations(self.activations)
+            self.set_load_count(self.load_count)
+            self.post_action(self.emit, "component_changed", self.current_component_index)
+            self.prev_component = self.current_component
+
+        if self.route is None:
+            self.post_action(self.emit, "status_update", "No route loaded", False, False, droppable=True)
+            return
+        elif self.route.splits is None or len(self.route.splits) == 0:
+            self.post_action(self.emit, "status_update", "Route has no splits", False, False, droppable=True)
+            return
+        else:
+            if not self.livesplit.connected:
+                self.post_action(self.emit, "status_update", "Livesplit not connected", False, False, droppable=True)
+                return
+
+            if not self.run_started and not self.wait_for_first_split:
+                if self.wait_for_reset:
+                    self.post_action(self.emit, "status_update", "Waiting for livesplit to reset", True, False, droppable=True)
+                    return
+
+                # Handle starting detection based on selected detector
+                start_condition = getattr(self.route, "start_condition", None)
+                if self.starting_detector == "switch" and frame.switch_hit:
+                    self.start_run()
+                elif start_condition == "livesplit":
+                    self.post_action(self.emit, "status_update", "Waiting for livesplit to start", False, True, droppable=True)
+                    timer = self.livesplit.get_timer()
+                    if timer is not None and timer != datetime.timedelta(0, 0, 0, 0, 0, 0):
+                        self.start_run()
+                        print("Start")
+                    return
+                elif start_condition == "first_split":
+                    self.current_split_index = 0
+                    self.current_component_index = 0
+                    self.wait_for_first_split = True
+
+                    try:
+                        self.current_split = self.route.splits[self.current_split_index]
+                    except Exception as e:
+                        logging.exception(e)
+                        return
+
+                    try:
+                        self.current_component = self.current_split.components[self.current_component_index]
+                    except Exception as e:
+                        logging.exception(e)
+                        return
+
+                    self.post_action(self.emit, "next_split")
+                elif not self.run_started:
+                    # Wait for the starting detector or a manual start
+                    return
+
+            if self.current_split is None:
+                if len(self.route.splits) > 0:
+                    try:
+                        self.current_split = self.route.splits[self.current_split_index]
+                    except:
+                        pass
+
+            if self.current_split is None:
+                self.post_action(self.emit, "status_update", "Route has no splits", True, False, droppable=True)
+
+            if self.current_split is not None:
+                if self.current_component is None:
+                    try:
+                        self.current_component = self.current_split.components[self.current_component_index]
+                    except:
+                        pass
+
+                if self.current_component is None:
+                    self.post_action(self.emit, "status_update", "Current split has no components", True, False, droppable=True)
+
+                if self.current_component is not None:
+                    check_ending = (self.current_split_index == len(self.route.splits) - 1 and
+                                    self.ending_detector == "switch")
+
+                    # Resume as soon as the picture returns, before looking for the next load
+                    if self.is_in_load_state and frame.load_end_time is not None:
+                        self.resume_game_time(frame.load_end_time)
+                        print("Timer resumed - exiting load state")
+                    elif self.is_in_load_state and frame.timestamp - self.load_start_time > self.max_load_time:
+                        self.end_missed_load(f"no load exit seen within {self.max_load_time:.0f}s")
+
+                    # Handle load detection based on current split's load type
+                    with tracer.span("handle_load_detection"):
+                        self.handle_load_detection(frame)
+
+                    # Update frame counter for delayed actions
+                    with tracer.span("update_frame_count"):
+                        self.update_frame_count(frame)
+
+                    # Handle ending detection for the last split
+                    if check_ending and frame.switch_hit:
+                        if self.current_split and self.current_split.split:
+                            self.post_action(self.livesplit.split_timer)
+                        self.next_split()
+
+    def get_detector_state(self, frame):
+        """Detector state saved with each replay frame"""
+        return {
+            "split": self.current_split_index,
+            "load_count": self.load_count,
+            "in_load": self.is_in_load_state,
+            "load_end_time": frame.load_end_time,
+            "full_detection": frame.full_detection,
+            "load_start_time": self.load_start_time,
+            "loading_time": self.loading_time,
+            "waiting_for_fadein": self.waiting_for_fadein,
+            "banner_count": int(self.banner_detector.banner_classifier.count),
+            "fade_count": int(self.fade_detector.fade_classifier.count),
+            "ghost_house_count": int(self.fade_detector.ghost_house_classifier.count),
+            "tower_castle_count": int(self.fade_detector.tower_castle_classifier.count),
+            "switch_detected": self.switch_detector.switch_detected,
+            "switch_hit": frame.switch_hit,
+            "load_detected": frame.load_detected,
+            "skipped": frame.skipped,
+            "dropped": frame.dropped,
+            "duplicate": frame.duplicate,
+        }
+
+    def save_replay(self):
+        """Write the last few seconds of frames to disk without pausing detection"""
+        if self.video_capture.replay_buffer is None:
+            logging.warning("Replay buffer is disabled")
+            return
+
+        path = os.path.join(Config.appdata, "replays", datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S"))
+        self.video_capture.replay_buffer.dump(path)
+
+    def handle_load_detection(self, frame):
+        """Count a load found by the inference stage"""
+        if frame.load_detected is None:
+            return
+
+        # The inference stage may not have seen the latest cooldown yet
+        if self.last_load_time is not None and frame.timestamp - self.last_load_time < self.load_cooldown:
+            return
+
+        tracer.instant("load_detected", {"seq": frame.seq, "load_type": frame.load_detected})
+        self.handle_load_detected(frame.load_detected, frame)
+
+    def handle_load_detected(self, load_type, frame):
+        """Process a detected load"""
+        # Loads are at least a cooldown apart, so still being in one means its exit was missed
+        if self.is_in_load_state:
+            self.end_missed_load("next load detected before the load exit")
+
+        self.last_load_time = frame.timestamp
+        self.current_load_type = load_type
+        
+        print(f"Load detected: {load_type} (frame {frame.seq}, {time.monotonic() - frame.timestamp:.3f}s after capture)")
+        
+        # Update load count
+        self.load_count += 1
+        if hasattr(self.current_split, 'actual_loads'):
+            self.current_split.actual_loads = self.load_count
+        
+        # Update UI
+        self.set_load_count(self.load_count)
+        
+        split_plan = self.get_split_plan()
+        expected_loads = split_plan.expected_loads if split_plan is not None else self.current_split.expected_loads
+
+        # Print load count update
+        print(f"Load count: {self.load_count}/{expected_loads}")
+        
+        # Handle timer control based on load state
+        self.control_timer_based_on_load_state(frame)
+        
+        # Check if we've reached the expected number of loads for this split
+        if self.load_count >= expected_loads:
+            self.handle_final_load(frame)
+
+    def control_timer_based_on_load_state(self, frame):
+        """Control LiveSplit timer based on load state"""
+        if not self.is_in_load_state:
+            # Entering load state - pause timer
+            self.pause_game_time(frame.load_start_time if frame.load_start_time is not None else frame.timestamp)
+            print("Timer paused - entering load state")
+
+    def pause_game_time(self, start_time):
+        """Pause game time for a load that started at this capture time"""
+        self.is_in_load_state = True
+        self.load_start_time = start_time
+        self.post_action(self.livesplit.pause_timer)
+
+    def resume_game_time(self, end_time):
+        """Resume game time and set LiveSplit's loading times to the total measured from frame timestamps"""
+        self.is_in_load_state = False
+        if self.load_start_time is not None:
+            self.loading_time += max(end_time - self.load_start_time, 0.0)
+            self.load_start_time = None
+
+        self.post_action(self.livesplit.resume_timer)
+        # Detection latency shifts when the pause and resume arrive but not the load's length
+        if self.correct_game_time:
+            self.post_action(self.livesplit.set_loading_times, self.loading_time)
+
+    def end_missed_load(self, reason):
+        """Resume game time for a load whose end the load exit detector never saw"""
+        # Only the part of the load up to its detection is known to be loading
+        logging.warning(f"Ending load without a detected exit ({reason}), resuming at the load's detection time")
+        end_time = self.load_start_time
+        if self.last_load_time is not None and self.last_load_time > end_time:
+            end_time = self.last_load_time
+        self.resume_game_time(end_time)
+
+    def end_final_load(self):
+        """Resume game time for a load still in progress when the last split is about to finish the run"""
+        # Nothing checks for the load's exit once the run has finished, so it has to end before the final split
+        if self.is_in_load_state and self.current_split_index + 1 >= len(self.route.splits):
+            self.resume_game_time(self.last_frame_time)
+            print("Timer resumed - run finished during a load")
+
+    def handle_final_load(self, frame):
+        """Handle the final load in a split"""
+        print("Final load reached for split")
+        
+        # Wait for fade-in completion
+        self.waiting_for_fadein = True
+        
+        # Split a few captured frames later, counting frames that were skipped or dropped
+        split_plan = self.get_split_plan()
+        self.split_at_seq = frame.seq + (split_plan.split_delay if split_plan is not None else 10)
+
+    def update_frame_count(self, frame):
+        """Update frame counter for delayed actions"""
+        if self.waiting_for_fadein:
+            if frame.seq >= self.split_at_seq:
+                self.end_final_load()
+                if self.current_split and self.current_split.split:
+                    self.post_action(self.livesplit.split_timer)
+                    print("Split executed after fade-in")
+                self.waiting_for_fadein = False
+                self.next_split()
+
+    def start_run(self):
+        if self.route is None:
+            logging.warning("No route is currently loaded")
+            return
+
+        self.post_action(self.livesplit.start_timer)
+        self.run_started = True
+        self.current_split_index = 0
+        self.loading_time = 0.0
+        self.load_start_time = None
+
+        try:
+            self.current_split = self.route.splits[self.current_split_index]
+        except Exception as e:
+            logging.exception(e)
+            return
+
+        self.current_component_index = 0
+        self.load_count = 0
+        self.is_in_load_state = False
+
+        try:
+            self.current_component = self.current_split.components[self.current_component_index]
+        except Exception as e:
+            logging.exception(e)
+            return
+
+        self.post_action(self.emit, "next_split")
+
+    def component_activated(self):
+        print("Component Activated")
+        if self.route is None:
+            logging.warning("No route is currently loaded")
+            return
+
+        self.set_activations(self.activations + 1)
+
+        if self.activations >= self.current_component.activations:
+            self.current_component_index += 1
+            self.activations = 0
+
+        if self.current_component_index >= len(self.current_split.components):
+            self.next_split()
+            return
+
+        try:
+            self.current_component = self.current_split.components[self.current_component_index]
+        except Exception as e:
+            logging.exception(e)
+            return
+
+    def next_split(self):
+        if not self.run_started and not self.wait_for_first_split:
+            return
+
+        print("Next Split")
+        if self.route is None:
+            logging.warning("No route is currently loaded")
+            return
+
+        self.end_final_load()
+
+        if self.current_split.split:
+            if self.wait_for_first_split:
+                self.run_started = True
+                self.wait_for_first_split = False
+                self.loading_time = 0.0
+                # A load still in progress only counts from the start of the run
+                self.load_start_time = self.last_frame_time if self.is_in_load_state else None
+                self.post_action(self.livesplit.start_timer)
+                if self.is_in_load_state:
+                    self.post_action(self.livesplit.pause_timer)
+            else:
+                self.post_action(self.livesplit.split_timer)
+
+        self.current_split_index += 1
+        self.split_time = self.last_frame_time
+
+        if self.current_split_index >= len(self.route.splits):
+            self.post_action(self.emit, "next_split")
+            self.run_started = False
+            self.wait_for_reset = True
+            print("Run Finished")
+            return
+
+        try:
+            self.current_split = self.route.splits[self.current_split_index]
+        except Exception as e:
+            logging.exception(e)
+            return
+
+        if self.current_split.reset_load_count:
+            self.load_count = 0
+
+        self.current_component_index = 0
+        self.activations = 0
+        self.waiting_for_fadein = False
+
+        try:
+            self.current_component = self.current_split.components[self.current_component_index]
+        except Exception as e:
+            logging.exception(e)
+            return
+
+        self.post_action(self.emit, "next_split")
+
+    def skip_split(self):
+        if not self.run_started:
+            return
+
+        print("Skip Split")
+        if self.route is None:
+            logging.warning("No route is currently loaded")
+            return
+
+        self.current_split_index += 1
+
+        if self.current_split_index >= len(self.route.splits):
+            self.current_split_index = len(self.route.splits) - 1
+            return
+
+        try:
+            self.current_split = self.route.splits[self.current_split_index]
+        except Exception as e:
+            logging.exception(e)
+            return
+
+        if self.current_split.reset_load_count:
+            self.load_count = 0
+
+        self.current_component_index = 0
+        self.activations = 0
+        self.waiting_for_fadein = False
+
+        try:
+            self.current_component = self.current_split.components[self.current_component_index]
+        except Exception as e:
+            logging.exception(e)
+            return
+
+        self.post_action(self.emit, "next_split")
+
+    def undo_split(self):
+        print("Undo Split")
+        if self.route is None:
+            logging.warning("No route is currently loaded")
+            return
+
+        self.current_split_index -= 1
+
+        if self.current_split_index < 0:
+            self.current_component_index = 0
+            return
+
+        try:
+            self.current_split = self.route.splits[self.current_split_index]
+        except Exception as e:
+            logging.exception(e)
+            return
+
+        self.current_component_index = 0
+        self.activations = 0
+        self.waiting_for_fadein = False
+
+        try:
+            self.current_component = self.current_split.components[self.current_component_index]
+        except Exception as e:
+            logging.exception(e)
+            return
+
+        self.post_action(self.emit, "prev_split")
+
+    def reset_run(self):
+        print("Reset")
+        self.post_action(self.livesplit.reset_timer)
+        self.current_split_index = 0
+        self.current_split = None
+        self.current_component_index = 0
+        self.current_component = None
+        self.load_count = 0
+        self.activations = 0
+        self.run_started = False
+        self.wait_for_first_split = False
+        self.wait_for_reset = False
+        self.waiting_for_fadein = False
+        self.is_in_load_state = False
+        self.last_load_time = None
+        self.load_start_time = None
+        self.loading_time = 0.0
+        # The inference stage owns the detectors, so let it reset them before the next frame
+        self.detectors_reset.set()
+        self.post_action(self.emit, "reset_splits")
+
+    def route_changed(self):
+        """Forget the position in the previous route unless a run is in progress"""
+        if self.run_started:
+            return
+
+        self.wait_for_first_split = False
+        self.current_split_index = 0
+        self.current_split = None
+        self.current_component_index = 0
+        self.current_component = None
+
+    def set_activations(self, value):
+        self.activations = value
+        if self.current_component is not None:
+            self.post_action(self.emit, "component_activated", self.activations, self.current_component.activations)
+
+    def set_load_count(self, value):
+        self.load_count = value
+        if self.current_split is not None and hasattr(self.current_split, 'expected_loads'):
+            self.post_action(self.emit, "load_count_changed", self.load_count, self.current_split.expected_loads)
\ No newline at end of file
@@ -0,0 +1,142 @@
+import cv2
+import numpy as np
+
+
+class Frame:
+    """Captured frame that is only decoded as far as the detectors and preview need"""
+    width = 640
+    height = 480
+
+    def __init__(self, data, pixel_format="rgb", seq=0, timestamp=0.0):
+        # A (480, 640, 3) RGB image, a (480, 640, 2) YUYV image or the raw bytes of an MJPEG frame
+        self.data = data
+        self.pixel_format = pixel_format
+
+        # Capture sequence number and monotonic capture time in seconds
+        self.seq = seq
+        self.timestamp = timestamp
+        # Frames passed over by the reader and frames lost by the capture device since the previous frame
+        self.skipped = 0
+        self.dropped = 0
+        # Set when the picture is the same as the previous frame's
+        self.duplicate = False
+        # Cleared when the scheduler only runs the cheap thumbnail detectors on this frame
+        self.full_detection = True
+        # Detector results filled in by the inference stage
+        self.switch_hit = False
+        self.load_detected = None
+        # Capture time the detected load started, before the classifier was sure of it
+        self.load_start_time = None
+        # Capture time the picture came back after a load
+        self.load_end_time = None
+
+        self.image = None
+        self.gray_thumbnail = None
+        # Thumbnail features shared by the classifiers, gates and the scheduler
+        self.thumbnail_mean = None
+        self.masks = {}  # level -> 0/1 mask of pixels brighter than it
+        self.dark_counts = {}  # level -> number of pixels at or below it
+        # Other features by name, see get_feature()
+        self.features = {}
+
+    def detach(self, keep_image=True):
+        """Let go of a shared memory slot so the frame stays valid after the next read"""
+        if self.data is None or self.data.base is None:
+            return
+
+        # Only the full resolution image is copied out of the slot and only when it's kept,
+        # anything else later stages read has to be decoded before this
+
+        if keep_image:
+            self.get_image()
+        if keep_image and self.image is self.data:
+            self.own_data()
+        else:
+            if self.image is self.data:
+                self.image = None
+            self.data = None
+
+    def own_data(self):
+        """Copy the data out of a shared memory slot, the frame uses the copy from then on"""
+        if self.data is not None and self.data.base is not None:
+            shares_image = self.image is self.data
+            self.data = self.data.copy()
+            if shares_image:
+                self.image = self.data
+
+    def has_image(self):
+        """False once the full resolution image can't be decoded anymore, see detach()"""
+        return self.image is not None or self.data is not None
+
+    def get_image(self):
+        """Get the full resolution 640x480 RGB image"""
+        if self.image is None:
+            if self.pixel_format == "jpeg":
+                image = cv2.imdecode(self.data, cv2.IMREAD_COLOR)
+                if image is None:
+                    # Keep the pipeline going on a corrupt frame
+                    image = np.zeros((self.height, self.width, 3), np.uint8)
+                if image.shape[0] != self.height or image.shape[1] != self.width:
+                    image = cv2.resize(image, (self.width, self.height), interpolation=cv2.INTER_LINEAR)
+                self.image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+            elif self.pixel_format == "yuyv":
+                self.image = cv2.cvtColor(self.data, cv2.COLOR_YUV2RGB_YUYV)
+            else:
+                self.image = self.data
+
+        return self.image
+
+    def get_gray_thumbnail(self):
+        """Get the 32x24 grayscale thumbnail used by the banner and fade classifiers"""
+        if self.gray_thumbnail is None:
+            if self.pixel_format == "jpeg":
+                # Let libjpeg decode at 1/8 scale instead of decoding every pixel and throwing them away. The pixels
+                # are 8x8 block averages, not the single pixels the models and dark levels were tuned on, which is
+                # why raw MJPEG capture is off by default. Used even when the full image has been decoded, so a
+                # frame's thumbnail doesn't depend on what decoded it first
+                image = cv2.imdecode(self.data, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+                if image is None:
+                    image = np.zeros((self.height // 8, self.width // 8), np.uint8)
+                self.gray_thumbnail = cv2.resize(image, (32, 24), interpolation=cv2.INTER_NEAREST)
+            elif self.pixel_format == "yuyv" and self.image is None:
+                # YUYV converts pixel pair by pixel pair, so converting only the sampled pairs gives the same
+                # pixels as converting the whole image and resizing it with INTER_NEAREST
+                step_y, step_x = self.height // 24, self.width // 32
+                pairs = self.data[::step_y].reshape(24, self.width // 2, 4)[:, ::step_x // 2]
+                image = cv2.cvtColor(np.ascontiguousarray(pairs).reshape(24, 64, 2), cv2.COLOR_YUV2RGB_YUYV)
+                self.gray_thumbnail = cv2.cvtColor(image[:, ::2], cv2.COLOR_RGB2GRAY)
+            else:
+                # Resize first so only the 768 sampled pixels get converted
+                image = cv2.resize(self.get_image(), (32, 24), interpolation=cv2.INTER_NEAREST)
+                self.gray_thumbnail = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+
+        return self.gray_thumbnail
+
+    def get_thumbnail_mean(self):
+        if self.thumbnail_mean is None:
+            self.thumbnail_mean = float(self.get_gray_thumbnail().mean())
+        return self.thumbnail_mean
+
+    def get_mask(self, level):
+        """32x24 uint8 mask that is 1 where the thumbnail is brighter than level"""
+        mask = self.masks.get(level)
+        if mask is None:
+            _, mask = cv2.threshold(self.get_gray_thumbnail(), level, 1, cv2.THRESH_BINARY)
+            self.masks[level] = mask
+        return mask
+
+    def get_dark_count(self, level):
+        """Number of thumbnail pixels at or below level"""
+        count = self.dark_counts.get(level)
+        if count is None:
+            count = self.get_mask(level).size - cv2.countNonZero(self.get_mask(level))
+            self.dark_counts[level] = count
+        return count
+
+    def get_feature(self, name, compute):
+        """Get a feature computed once per frame by compute(frame) and shared by every detector using that name"""
+        feature = self.features.get(name)
+        if feature is None:
+            feature = compute(self)
+            self.features[name] = feature
+        return feature
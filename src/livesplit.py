@@ -1,21 +1,23 @@
 import datetime
 import logging
 import socket
+import threading
 import time
 import re
 
 from src.config import Config
+from src.tracing import tracer
 
-from PyQt5.QtCore import pyqtSignal
-from PyQt5.QtCore import QThread
-
-
-class Livesplit(QThread):
-    sig_connection_status = pyqtSignal(bool)  
-    sig_timer_reset = pyqtSignal()
 
+class Livesplit(threading.Thread):
+    """LiveSplit Server connection, kept alive and polled for timer resets in the background"""
     def __init__(self):
-        QThread.__init__(self)
+        threading.Thread.__init__(self, name="Livesplit", daemon=True)
+
+        # Called with the new connection status and when the timer is reset from LiveSplit
+        self.on_connection_status = None
+        self.on_timer_reset = None
+        self.stop_event = threading.Event()
 
         self.connected = False
 
@@ -31,16 +33,19 @@ class Livesplit(QThread):
         self.timer_phase = "NotRunning"
 
     def run(self):
-        time.sleep(1)
-        while True:
+        self.stop_event.wait(1)
+        while not self.stop_event.is_set():
             if not self.connected:
                 self.connect()
             else:
                 self.check_connection()
-                time.sleep(self.read_interval)
+                self.stop_event.wait(self.read_interval)
                 self.check_reset()
 
-            time.sleep(1 - self.read_interval)
+            self.stop_event.wait(1 - self.read_interval)
+
+    def stop(self):
+        self.stop_event.set()
 
     def check_connection(self):
         try:
@@ -60,7 +65,8 @@ class Livesplit(QThread):
         state = self.get_timer_phase()
         if state == "NotRunning" and (self.prev_state == "Running" or self.prev_state == "Ended"):
             self.timer = datetime.timedelta(0, 0, 0, 0, 0, 0)
-            self.sig_timer_reset.emit()
+            if self.on_timer_reset is not None:
+                self.on_timer_reset()
         self.prev_state = state
 
     def connect(self):
@@ -74,11 +80,13 @@ class Livesplit(QThread):
 
     def set_connection_status(self, connected):
         self.connected = connected
-        self.sig_connection_status.emit(connected)
+        if self.on_connection_status is not None:
+            self.on_connection_status(connected)
 
     def send(self, cmd):
         try:
-            self.socket.send(bytes(cmd) + b"\r\n")
+            with tracer.span("livesplit.send", {"cmd": cmd.decode()} if tracer.enabled else None):
+                self.socket.send(bytes(cmd) + b"\r\n")
         except Exception as e:
             logging.warning("LiveSplit command send failed")
             logging.exception(e)
@@ -86,9 +94,10 @@ class Livesplit(QThread):
     def read(self, cmd):
         self.prev_read = time.time()
         try:
-            self.socket.send(bytes(cmd) + b"\r\n")
-            self.socket.settimeout(10)
-            response = self.socket.recv(1024).decode("utf-8").strip()
+            with tracer.span("livesplit.read", {"cmd": cmd.decode()} if tracer.enabled else None):
+                self.socket.send(bytes(cmd) + b"\r\n")
+                self.socket.settimeout(10)
+                response = self.socket.recv(1024).decode("utf-8").strip()
             return response
         except Exception as e:
             logging.warning("LiveSplit command send failed")
@@ -142,6 +151,17 @@ class Livesplit(QThread):
         """Resume the game time using LiveSplit's unpausegametime command"""
         self.send(b"unpausegametime")
 
+    def set_loading_times(self, seconds):
+        """Set the total load time LiveSplit takes off real time to get game time"""
+        self.send(b"setloadingtimes " + self.format_timer(seconds).encode())
+
+    @staticmethod
+    def format_timer(seconds):
+        """Format seconds as H:MM:SS.fff for LiveSplit Server commands"""
+        minutes, seconds = divmod(round(max(seconds, 0.0), 3), 60)
+        hours, minutes = divmod(int(minutes), 60)
+        return f"{hours}:{minutes:02d}:{seconds:06.3f}"
+
     def get_timer(self):
         if time.time() > self.prev_read + self.read_interval:
             response = self.read(b"getcurrenttime")
@@ -32,8 +32,9 @@ class PageDashboard(QObject):
         self.setup_counters()
 
         # Connect signals
-        self.ui.page_dashboard_undo_btn.clicked.connect(self.autosplitter.undo_split)
-        self.ui.page_dashboard_skip_btn.clicked.connect(self.autosplitter.skip_split)
+        self.ui.page_dashboard_undo_btn.clicked.connect(self.autosplitter.engine.request_undo_split)
+        self.ui.page_dashboard_skip_btn.clicked.connect(self.autosplitter.engine.request_skip_split)
+        self.ui.page_dashboard_save_replay_btn.clicked.connect(self.autosplitter.engine.save_replay)
 
     def setup_counters(self):
         """Replace progress bars with counter labels"""
@@ -81,6 +82,7 @@ class PageDashboard(QObject):
         # Set font for buttons
         self.ui.page_dashboard_undo_btn.setFont(montserrat_font)
         self.ui.page_dashboard_skip_btn.setFont(montserrat_font)
+        self.ui.page_dashboard_save_replay_btn.setFont(montserrat_font)
         self.ui.page_dashboard_close_route_btn.setFont(montserrat_font)
         self.ui.page_dashboard_load_route_btn.setFont(montserrat_font)
         self.ui.page_dashboard_save_route_btn.setFont(montserrat_font)
@@ -97,6 +99,7 @@ class PageDashboard(QObject):
         self.ui.splits_list.setFont(montserrat_font)
         self.ui.page_dashboard_undo_btn.setFont(montserrat_font)
         self.ui.page_dashboard_skip_btn.setFont(montserrat_font)
+        self.ui.page_dashboard_save_replay_btn.setFont(montserrat_font)
         self.ui.page_dashboard_close_route_btn.setFont(montserrat_font)
         self.ui.page_dashboard_load_route_btn.setFont(montserrat_font)
         self.ui.page_dashboard_save_route_btn.setFont(montserrat_font)
@@ -139,6 +142,7 @@ class PageDashboard(QObject):
 
     def set_show_preview(self, value):
         self.show_preview = value
+        self.autosplitter.engine.show_preview = value
         Config.set_key("show_preview", self.show_preview)
 
     def get_preview_size(self):
@@ -183,7 +187,7 @@ class PageDashboard(QObject):
         
         # Calculate level progress
         total_levels = len(RouteHandler.route.splits) if RouteHandler.route else 0
-        current_level = self.autosplitter.current_split_index + 1 if self.autosplitter.current_split_index is not None else 0
+        current_level = self.autosplitter.engine.current_split_index + 1 if self.autosplitter.engine.current_split_index is not None else 0
         self.level_counter_label.setText(f"Levels: {current_level}/{total_levels}")
 
     def component_activated(self, value, required):
@@ -199,8 +203,8 @@ class PageDashboard(QObject):
             self.set_active_split(np.clip(current_index + 1, 0, self.ui.splits_list.count()))
             
         # Update level counter
-        self.load_count_changed(self.autosplitter.load_count, 
-                               self.autosplitter.current_split.expected_loads if self.autosplitter.current_split else 0)
+        self.load_count_changed(self.autosplitter.engine.load_count, 
+                               self.autosplitter.engine.current_split.expected_loads if self.autosplitter.engine.current_split else 0)
 
     def prev_split(self):
         current_index = self.get_active_split()
@@ -211,8 +215,8 @@ class PageDashboard(QObject):
             self.set_active_split(np.clip(current_index - 1, 0, self.ui.splits_list.count() - 1))
             
         # Update level counter
-        self.load_count_changed(self.autosplitter.load_count, 
-                               self.autosplitter.current_split.expected_loads if self.autosplitter.current_split else 0)
+        self.load_count_changed(self.autosplitter.engine.load_count, 
+                               self.autosplitter.engine.current_split.expected_loads if self.autosplitter.engine.current_split else 0)
 
     def get_active_split(self):
         selected_index = self.ui.splits_list.selectedIndexes()
@@ -248,11 +252,12 @@ class PageDashboard(QObject):
             self.route_updated()
 
     def route_updated(self):
-        if self.autosplitter.run_started:
+        # The engine keeps its place in the route while a run is in progress
+        self.autosplitter.engine.request_set_route(RouteHandler.route)
+
+        if self.autosplitter.engine.run_started:
             self.reload_splits = True
             return
-        else:
-            self.autosplitter.wait_for_first_split = False
 
         self.clear_splits()
 
@@ -0,0 +1,181 @@
+import collections
+import logging
+import threading
+import time
+
+from src.tracing import tracer
+
+
+class StageQueue:
+    """Bounded queue between pipeline stages that drops the oldest droppable item when full"""
+    def __init__(self, maxsize, block=False):
+        self.maxsize = maxsize
+        # Make the producer wait for room instead of dropping anything
+        self.block = block
+        self.items = collections.deque()  # (put time, item, droppable)
+        self.dropped = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def put(self, item, droppable=True):
+        """Add an item, items that must not be lost are kept even when the queue is full"""
+        with self.condition:
+            if self.block:
+                self.condition.wait_for(lambda: len(self.items) < self.maxsize or self.closed)
+                if self.closed:
+                    return
+
+            if len(self.items) >= self.maxsize:
+                for i, (_, _, item_droppable) in enumerate(self.items):
+                    if item_droppable:
+                        del self.items[i]
+                        self.dropped += 1
+                        break
+
+            self.items.append((time.monotonic(), item, droppable))
+            self.condition.notify_all()
+
+    def get(self, timeout=None):
+        """Wait for the oldest item and return it with the time it spent in the queue"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.items or self.closed, timeout)
+            if not self.items:
+                return None, 0.0
+
+            put_time, item, _ = self.items.popleft()
+            # Wake a producer waiting for room
+            self.condition.notify_all()
+
+        return item, time.monotonic() - put_time
+
+    def close(self):
+        """Wake the consumer so it can notice it's been stopped"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class CaptureQueue:
+    """Lets the first stage wait on the capture ring buffer like on any other stage queue"""
+    def __init__(self, video_capture):
+        self.video_capture = video_capture
+
+    @property
+    def dropped(self):
+        # Frames overwritten in the ring buffer before they could be read
+        return self.video_capture.skipped_frames
+
+    def get(self, timeout=None):
+        retval, frame, _ = self.video_capture.get_frame(timeout)
+        return (frame if retval else None), 0.0
+
+    def close(self):
+        self.video_capture.interrupt()
+
+
+class StageStats:
+    """Throughput and latency of one stage since the last time they were read"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.busy_time = 0.0
+        self.latency = 0.0
+        self.max_latency = 0.0
+        self.start_time = time.monotonic()
+
+    def record(self, busy_time, latency):
+        with self.lock:
+            self.count += 1
+            self.busy_time += busy_time
+            self.latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def read(self):
+        """Get the stats and start a new measuring window"""
+        with self.lock:
+            elapsed = max(time.monotonic() - self.start_time, 1e-6)
+            count = max(self.count, 1)
+            stats = {
+                "rate": self.count / elapsed,
+                "busy_ms": self.busy_time / count * 1000,
+                "latency_ms": self.latency / count * 1000,
+                "max_latency_ms": self.max_latency * 1000,
+            }
+
+            self.count = 0
+            self.busy_time = 0.0
+            self.latency = 0.0
+            self.max_latency = 0.0
+            self.start_time = time.monotonic()
+
+        return stats
+
+
+class Stage(threading.Thread):
+    """Worker that takes items from its input queue, handles them and passes the results on"""
+    def __init__(self, name, handler, input_queue, output_queue=None, droppable=None):
+        threading.Thread.__init__(self, name=name, daemon=True)
+
+        self.handler = handler
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        # droppable(result) tells if a result may be dropped when the output queue is full, all of them may by default
+        self.droppable = droppable
+        self.stats = StageStats()
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            item, wait_time = self.input_queue.get()
+            if item is None:
+                continue
+
+            start = time.perf_counter()
+            try:
+                # Spans carry the frame number so one frame can be followed across the stage threads
+                args = {"seq": getattr(item, "seq", None)} if tracer.enabled else None
+                with tracer.span(self.name, args):
+                    result = self.handler(item)
+            except Exception as e:
+                logging.exception(f"Error in {self.name} stage: {e}")
+                continue
+            busy_time = time.perf_counter() - start
+
+            # Latency counts the time spent waiting in the queue as well
+            self.stats.record(busy_time, wait_time + busy_time)
+
+            if result is not None and self.output_queue is not None:
+                self.output_queue.put(result, self.droppable is None or self.droppable(result))
+
+    def stop(self):
+        self.stop_event.set()
+        self.input_queue.close()
+
+    def get_stats(self):
+        stats = self.stats.read()
+        stats["dropped"] = getattr(self.input_queue, "dropped", 0)
+        return stats
+
+
+class Pipeline:
+    """Group of stages that are started, stopped and reported on together"""
+    def __init__(self, stages):
+        self.stages = stages
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self, timeout=1.0):
+        for stage in self.stages:
+            stage.stop()
+        for stage in self.stages:
+            stage.join(timeout)
+
+    def get_stats(self):
+        return {stage.name: stage.get_stats() for stage in self.stages}
+
+    def format_stats(self):
+        return ", ".join(f"{name} {stats['rate']:.1f}/s {stats['busy_ms']:.2f}ms busy "
+                         f"{stats['latency_ms']:.2f}ms latency {stats['dropped']} dropped"
+                         for name, stats in self.get_stats().items())
@@ -0,0 +1,114 @@
+import collections
+import json
+import logging
+import os
+import queue
+import threading
+
+import cv2
+
+from src.frame import Frame
+
+
+class ReplayBuffer:
+    """Last few seconds of frames kept JPEG compressed so misdetections can be dumped to disk"""
+    def __init__(self, seconds=10.0, max_bytes=64 * 1024 * 1024, size=(320, 240), quality=80):
+        self.seconds = seconds
+        self.max_bytes = max_bytes
+        self.size = size
+        self.quality = quality
+
+        self.lock = threading.Lock()
+        self.entries = collections.deque()  # (seq, timestamp, jpeg bytes)
+        self.states = collections.deque()  # (seq, detector state)
+        self.total_bytes = 0
+
+        # Encoding happens off the detection loop, frames are dropped if it falls behind
+        self.encode_queue = queue.Queue(maxsize=8)
+        self.encode_thread = None
+        self.dropped_frames = 0
+
+    def add(self, frame):
+        """Queue a frame for compression without blocking the caller"""
+        if self.encode_thread is None:
+            self.encode_thread = threading.Thread(target=self.encode_loop, name="ReplayEncoder", daemon=True)
+            self.encode_thread.start()
+
+        # Frames read from shared memory are views into a slot the capture process will reuse,
+        # the frame takes over the copy so a later stage keeping the image doesn't copy it again
+        frame.own_data()
+        data = frame.data
+        try:
+            self.encode_queue.put_nowait((frame.seq, frame.timestamp, data, frame.pixel_format))
+        except queue.Full:
+            self.dropped_frames += 1
+
+    def annotate(self, seq, state):
+        """Record the detector state after processing the frame with this sequence number"""
+        with self.lock:
+            self.states.append((seq, state))
+
+    def encode_loop(self):
+        while True:
+            seq, timestamp, data, pixel_format = self.encode_queue.get()
+            try:
+                jpeg = self.encode(data, pixel_format)
+            except Exception as e:
+                logging.exception(f"Error compressing replay frame: {e}")
+                continue
+
+            with self.lock:
+                self.entries.append((seq, timestamp, jpeg))
+                self.total_bytes += len(jpeg)
+                self.evict(timestamp)
+
+    def encode(self, data, pixel_format):
+        # Raw MJPEG frames are already compressed
+        if pixel_format == "jpeg":
+            return data.tobytes()
+
+        image = cv2.resize(Frame(data, pixel_format).get_image(), self.size, interpolation=cv2.INTER_AREA)
+        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        _, jpeg = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return jpeg.tobytes()
+
+    def evict(self, newest_time):
+        while self.entries and (self.total_bytes > self.max_bytes or
+                                newest_time - self.entries[0][1] > self.seconds):
+            self.total_bytes -= len(self.entries.popleft()[2])
+
+        # Drop detector states of frames that are no longer kept
+        oldest_seq = self.entries[0][0] if self.entries else 0
+        while self.states and self.states[0][0] < oldest_seq:
+            self.states.popleft()
+
+    def dump(self, path):
+        """Write the buffered frames and detector states to a directory in a background thread"""
+        with self.lock:
+            entries = list(self.entries)
+            states = dict(self.states)
+
+        thread = threading.Thread(target=self.write_dump, args=(path, entries, states),
+                                  name="ReplayDump", daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def write_dump(path, entries, states):
+        try:
+            os.makedirs(path, exist_ok=True)
+            with open(os.path.join(path, "states.jsonl"), "w") as file:
+                for seq, timestamp, jpeg in entries:
+                    # Numbered so the directory can be replayed as an image sequence
+                    with open(os.path.join(path, f"{seq:08d}.jpg"), "wb") as image_file:
+                        image_file.write(jpeg)
+                    file.write(json.dumps({"seq": seq, "timestamp": timestamp, "state": states.get(seq)}) + "\n")
+            print(f"Saved {len(entries)} replay frames to \"{path}\"")
+        except Exception as e:
+            logging.exception(f"Error saving replay to \"{path}\": {e}")
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.states.clear()
+            self.total_bytes = 0
@@ -0,0 +1,279 @@
+import argparse
+import contextlib
+import datetime
+import json
+import logging
+import os
+import sys
+
+from src.capture_worker import FrameRingBuffer, CaptureThread
+from src.config import Config
+from src.engine import Engine
+from src.route import load_route_file
+from src.sources import create_source
+from src.tracing import tracer
+from src.vid_capture import DuplicateFrameFilter
+
+
+# LiveSplit command sent by the engine for each kind of ground truth event
+event_commands = {
+    "load_start": "pausegametime",
+    "load_end": "unpausegametime",
+    "split": "split",
+}
+
+
+class RecordingLivesplit:
+    """Stands in for the LiveSplit connection and records every command at the current frame"""
+    def __init__(self, fps):
+        self.fps = fps
+        self.connected = True
+        self.on_connection_status = None
+        self.on_timer_reset = None
+
+        self.frame_index = 0
+        self.start_frame = None
+        self.commands = []  # (command, frame index)
+        self.loading_times = None
+
+    def send(self, cmd):
+        self.commands.append((cmd.decode(), self.frame_index))
+
+    def start_timer(self):
+        self.start_frame = self.frame_index
+        self.send(b"starttimer")
+
+    def split_timer(self):
+        self.send(b"split")
+
+    def reset_timer(self):
+        self.start_frame = None
+        self.send(b"reset")
+
+    def pause_timer(self):
+        self.send(b"pausegametime")
+
+    def resume_timer(self):
+        self.send(b"unpausegametime")
+
+    def set_loading_times(self, seconds):
+        self.loading_times = seconds
+        self.send(b"setloadingtimes")
+
+    def get_timer(self):
+        if self.start_frame is None:
+            return datetime.timedelta(0)
+        return datetime.timedelta(seconds=(self.frame_index - self.start_frame) / self.fps)
+
+    def stop(self):
+        pass
+
+
+class ReplayHarness:
+    """Feeds a recording frame by frame through the engine's stages on one thread with a virtual clock"""
+    def __init__(self, source_spec, route, fps=60.0, start_frame=0):
+        self.source_spec = source_spec
+        self.route = route
+        self.fps = fps
+        self.start_frame = start_frame
+
+        self.livesplit = RecordingLivesplit(fps)
+        self.engine = Engine(self.livesplit)
+        self.engine.set_route(route)
+
+        self.frame_count = 0
+
+    def run(self):
+        """Process every frame of the recording, returns False if it can't be opened"""
+        source = create_source(self.source_spec, realtime=False)
+        if not source.open():
+            return False
+
+        # Frames take the same path into the ring buffer as in a capture thread, but time comes from the frame index
+        ring_buffer = FrameRingBuffer()
+        capture = CaptureThread(source, ring_buffer)
+        duplicate_filter = DuplicateFrameFilter() if Config.get_key("skip_duplicate_frames", True) else None
+
+        index = 0
+        try:
+            while True:
+                retval, data = source.read()
+                if source.finished:
+                    break
+
+                self.livesplit.frame_index = index
+                if index == self.start_frame and self.engine.starting_detector != "switch":
+                    self.engine.post_control_event(self.engine.start_run)
+
+                if retval and data is not None and data.size > 0 and capture.write_frame(data):
+                    ring_buffer.commit(index, index / self.fps)
+                    _, frame, _ = ring_buffer.read_latest(0)
+                    if duplicate_filter is not None:
+                        frame.duplicate = duplicate_filter.check(frame)
+
+                    with tracer.span("features", {"seq": frame.seq} if tracer.enabled else None):
+                        frame = self.engine.extract_features(frame)
+                    # Idle frames are dropped by the scheduler
+                    if frame is not None:
+                        with tracer.span("inference"):
+                            self.engine.run_detectors(frame)
+                        with tracer.span("state"):
+                            self.engine.update_state(frame)
+
+                index += 1
+        finally:
+            source.release()
+
+        self.frame_count = index
+        return True
+
+    def get_detections(self):
+        """Frame indices of the engine's LiveSplit commands, by ground truth event type"""
+        return {event_type: [index for cmd, index in self.livesplit.commands if cmd == command]
+                for event_type, command in event_commands.items()}
+
+
+def load_timeline(path):
+    """Read ground truth as {"fps": 60, "events": [{"type": "load_start", "frame": 120}, ...]}"""
+    with open(path, "r") as file:
+        timeline = json.load(file)
+
+    events = {event_type: [] for event_type in event_commands}
+    for event in timeline.get("events", []):
+        if event["type"] not in events:
+            logging.warning(f"Unknown ground truth event type \"{event['type']}\"")
+            continue
+        events[event["type"]].append(int(event["frame"]))
+
+    for frames in events.values():
+        frames.sort()
+
+    return timeline.get("fps", 60.0), timeline.get("start", 0), events
+
+
+def match_events(truth, detected, early, late):
+    """Pair each true event with the first unused detection from early frames before to late frames after it"""
+    unused = list(detected)
+    matches = []
+    misses = []
+    for truth_frame in truth:
+        match = next((frame for frame in unused if truth_frame - early <= frame <= truth_frame + late), None)
+        if match is None:
+            misses.append(truth_frame)
+        else:
+            unused.remove(match)
+            matches.append({"truth": truth_frame, "detected": match, "latency": match - truth_frame})
+
+    return matches, misses, unused
+
+
+def get_load_frames(starts, ends, frame_count):
+    """Total frames between each load start and the load end after it"""
+    total = 0
+    ends = list(ends)
+    for start in starts:
+        end = next((frame for frame in ends if frame >= start), frame_count)
+        if end in ends:
+            ends.remove(end)
+        total += end - start
+    return total
+
+
+def score(truth, detected, frame_count, fps, early=10, late=120, loading_times=None):
+    """Compare detections with ground truth, every number in frames unless it says seconds"""
+    report = {"frames": frame_count, "fps": fps, "events": {}}
+
+    for event_type in event_commands:
+        matches, misses, false_positives = match_events(truth[event_type], detected[event_type], early, late)
+        latencies = sorted(match["latency"] for match in matches)
+        report["events"][event_type] = {
+            "expected": len(truth[event_type]),
+            "detected": len(detected[event_type]),
+            "matched": len(matches),
+            "misses": misses,
+            "false_positives": false_positives,
+            "mean_latency": sum(latencies) / len(latencies) if latencies else None,
+            "median_latency": latencies[len(latencies) // 2] if latencies else None,
+            "max_latency": latencies[-1] if latencies else None,
+            "matches": matches,
+        }
+
+    truth_load_frames = get_load_frames(truth["load_start"], truth["load_end"], frame_count)
+    detected_load_frames = get_load_frames(detected["load_start"], detected["load_end"], frame_count)
+    report["load_removed"] = {
+        "expected_frames": truth_load_frames,
+        "detected_frames": detected_load_frames,
+        "error_frames": detected_load_frames - truth_load_frames,
+        "error_seconds": (detected_load_frames - truth_load_frames) / fps,
+    }
+
+    # Total the engine corrected LiveSplit's loading times to, measured from frame timestamps
+    if loading_times is not None:
+        report["load_removed"]["corrected_seconds"] = loading_times
+        report["load_removed"]["corrected_error_frames"] = loading_times * fps - truth_load_frames
+
+    return report
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(prog="python -m src.replay_harness",
+                                     description="Score load and split detection on a recording against ground truth")
+    parser.add_argument("recording", help="recorded video file or directory of frames")
+    parser.add_argument("timeline", help="ground truth JSON with load_start, load_end and split frame numbers")
+    parser.add_argument("route", help=".nsmbw route the run follows")
+    parser.add_argument("--output", help="write the JSON report here instead of to stdout")
+    parser.add_argument("--trace", help="write a Chrome trace of the detection stages to this file")
+    parser.add_argument("--early", type=int, default=10, help="frames a detection may come before the true event")
+    parser.add_argument("--late", type=int, default=120, help="frames a detection may come after the true event")
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+
+    recording = os.path.abspath(args.recording)
+    timeline_path = os.path.abspath(args.timeline)
+    route_path = os.path.abspath(args.route)
+    output = os.path.abspath(args.output) if args.output else None
+    trace_path = os.path.abspath(args.trace) if args.trace else None
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(filename)s:%(lineno)d - %(message)s", level=logging.WARNING)
+    Config.init()
+
+    route = load_route_file(route_path)
+    if route is None:
+        print(f"Couldn't load route \"{route_path}\"", file=sys.stderr)
+        return 1
+
+    fps, start_frame, truth = load_timeline(timeline_path)
+
+    # Keep the engine's progress messages out of the report
+    with contextlib.redirect_stdout(sys.stderr):
+        if trace_path is not None:
+            tracer.start(trace_path)
+        try:
+            harness = ReplayHarness(recording, route, fps, start_frame)
+            opened = harness.run()
+        finally:
+            tracer.stop()
+
+    if not opened:
+        print(f"Couldn't open recording \"{recording}\"", file=sys.stderr)
+        return 1
+
+    report = score(truth, harness.get_detections(), harness.frame_count, fps, args.early, args.late,
+                   harness.livesplit.loading_times)
+
+    if output is None:
+        json.dump(report, sys.stdout, indent=4)
+        print()
+    else:
+        with open(output, "w") as file:
+            json.dump(report, file, indent=4)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
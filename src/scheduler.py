@@ -0,0 +1,41 @@
+class DetectionScheduler:
+    """Decides which frames get full resolution detection from how likely a load or split is"""
+    def __init__(self, reduced_interval=4, idle_interval=8, hold_time=2.0):
+        # Every nth frame is still fully processed when no transition is expected, or when nothing is detected
+        self.reduced_interval = reduced_interval
+        self.idle_interval = idle_interval
+        # Seconds to stay at full rate after the screen starts darkening
+        self.hold_time = hold_time
+
+        # A thumbnail this dark on average, or with this share of near black pixels, may be a fade starting
+        self.dark_mean = 60
+        self.black_level = 16
+        self.dark_fraction = 0.1
+
+        self.dark_time = None
+        self.last_full_seq = None
+        self.full_frames = 0
+        self.reduced_frames = 0
+
+    def schedule(self, frame, mode):
+        """True if the frame gets every detector at full resolution in the "full", "reduced" or "idle" mode"""
+        full = mode == "full" or self.is_darkening(frame)
+
+        if not full:
+            interval = self.idle_interval if mode == "idle" else self.reduced_interval
+            full = self.last_full_seq is None or frame.seq - self.last_full_seq >= interval
+
+        if full:
+            self.last_full_seq = frame.seq
+            self.full_frames += 1
+        else:
+            self.reduced_frames += 1
+        return full
+
+    def is_darkening(self, frame):
+        size = frame.get_gray_thumbnail().size
+        if (frame.get_thumbnail_mean() < self.dark_mean or
+                frame.get_dark_count(self.black_level) >= self.dark_fraction * size):
+            self.dark_time = frame.timestamp
+
+        return self.dark_time is not None and frame.timestamp - self.dark_time < self.hold_time
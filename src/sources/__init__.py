@@ -0,0 +1,38 @@
+import os
+import sys
+
+from .capture_source import CaptureSource
+from .device_source import DeviceSource
+from .video_file_source import VideoFileSource
+from .image_sequence_source import ImageSequenceSource
+
+# The native V4L2 backend relies on Linux ioctls
+if sys.platform.startswith("linux"):
+    from .v4l2_source import V4L2Source
+else:
+    V4L2Source = None
+
+
+def create_source(spec, realtime=True, raw_mjpeg=False, v4l2=True):
+    """Create a capture source from a device index, a video file path or a frame directory"""
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        if v4l2 and V4L2Source is not None and V4L2Source.is_available(int(spec)):
+            return V4L2Source(int(spec))
+        return DeviceSource(int(spec), raw_mjpeg)
+    if os.path.isdir(spec):
+        return ImageSequenceSource(spec, realtime)
+    return VideoFileSource(spec, realtime)
+
+
+def open_source(spec, realtime=True, raw_mjpeg=False, v4l2=True):
+    """Create and open a capture source, falling back to OpenCV if the native backend can't drive the device"""
+    source = create_source(spec, realtime, raw_mjpeg, v4l2)
+    if source.open():
+        return source
+
+    if V4L2Source is not None and isinstance(source, V4L2Source):
+        source = DeviceSource(source.index, raw_mjpeg)
+        if source.open():
+            return source
+
+    return None
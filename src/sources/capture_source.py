@@ -0,0 +1,48 @@
+import time
+
+
+class CaptureSource:
+    """Base class for everything VideoCapture can grab frames from"""
+    def __init__(self, realtime=True):
+        # Realtime sources deliver frames at their own rate, others as fast as they are consumed
+        self.realtime = realtime
+        # Either "bgr" images or "jpeg" for raw MJPEG bytes
+        self.pixel_format = "bgr"
+        self.fps = 60.0
+        self.finished = False
+
+        self.pace_start = None
+        self.pace_frames = 0
+
+    def open(self):
+        return False
+
+    def is_opened(self):
+        return False
+
+    def read(self):
+        """Read the next frame in pixel_format, like cv2.VideoCapture.read()"""
+        return False, None
+
+    def release(self):
+        pass
+
+    def get_frame_time(self):
+        """Get the monotonic capture time and source sequence number of the last frame read"""
+        # Live sources without their own timestamps are stamped on arrival
+        return time.monotonic(), None
+
+    def pace(self):
+        """Sleep until the next frame is due when replaying in real time"""
+        if not self.realtime or self.fps <= 0:
+            return
+
+        if self.pace_start is None:
+            self.pace_start = time.perf_counter()
+
+        due_time = self.pace_start + self.pace_frames / self.fps
+        self.pace_frames += 1
+
+        delay = due_time - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,101 @@
+import logging
+import sys
+
+import cv2
+
+from src.sources.capture_source import CaptureSource
+
+
+class DeviceSource(CaptureSource):
+    """Capture card or webcam opened by device index"""
+    def __init__(self, index, raw_mjpeg=False):
+        CaptureSource.__init__(self, realtime=True)
+
+        self.index = index
+        self.raw_mjpeg = raw_mjpeg
+        self.capture_device = None
+
+    def open(self):
+        try:
+            # DSHOW only exists on Windows, don't waste a failed open on it anywhere else
+            capture_device = None
+            if sys.platform == "win32":
+                capture_device = cv2.VideoCapture(self.index, cv2.CAP_DSHOW)
+
+            # If DSHOW fails, try default backend
+            if capture_device is None or not capture_device.isOpened():
+                capture_device = cv2.VideoCapture(self.index)
+
+            if capture_device is None or not capture_device.isOpened():
+                logging.error(f"Can't open capture device at index {self.index}")
+                return False
+
+            # Test if we can actually read a frame
+            retval, test_frame = capture_device.read()
+            if not retval or test_frame is None:
+                logging.error(f"Capture device at index {self.index} is not providing frames")
+                capture_device.release()
+                return False
+
+        except Exception as e:
+            logging.exception(f"Error initializing capture device at index {self.index}: {e}")
+            return False
+
+        try:
+            # Set frame width to 640 (4:3 aspect ratio for NSMBW)
+            capture_device.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+            # Set frame height to 480
+            capture_device.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+            # Set framerate to 30fps for NSMBW (minimum) and allow up to 60fps
+            capture_device.set(cv2.CAP_PROP_FPS, 60)
+            # Set buffer size to minimize latency
+            capture_device.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            # Set fourcc codec for better compatibility
+            capture_device.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc('M', 'J', 'P', 'G'))
+        except Exception as e:
+            logging.exception(f"Error setting capture device properties: {e}")
+            # Continue even if properties can't be set
+
+        if self.raw_mjpeg:
+            self.enable_raw_mjpeg(capture_device)
+
+        # Used to spot dropped frames, so take the rate the device actually settled on
+        fps = capture_device.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if fps and fps > 0 else 60.0
+
+        self.capture_device = capture_device
+        return True
+
+    def enable_raw_mjpeg(self, capture_device):
+        """Ask the backend for undecoded MJPEG bytes so decoding can be done at reduced resolution"""
+        try:
+            capture_device.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+            retval, frame = capture_device.read()
+
+            # A raw frame is a single row of bytes starting with the JPEG SOI marker
+            if retval and frame is not None and frame.size > 2 and (frame.ndim == 1 or frame.shape[0] == 1):
+                data = frame.reshape(-1)
+                if data[0] == 0xFF and data[1] == 0xD8:
+                    self.pixel_format = "jpeg"
+                    logging.info(f"Capture device {self.index} delivers raw MJPEG")
+                    return True
+
+            capture_device.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+        except Exception as e:
+            logging.exception(f"Error enabling raw MJPEG capture: {e}")
+
+        logging.info(f"Capture device {self.index} doesn't support raw MJPEG, using decoded frames")
+        self.pixel_format = "bgr"
+        return False
+
+    def is_opened(self):
+        return self.capture_device is not None and self.capture_device.isOpened()
+
+    def read(self):
+        # The device blocks until its next frame, so no pacing is needed
+        return self.capture_device.read()
+
+    def release(self):
+        if self.capture_device is not None:
+            self.capture_device.release()
+            self.capture_device = None
@@ -0,0 +1,72 @@
+import logging
+import os
+import time
+
+import cv2
+import numpy as np
+
+from src.sources.capture_source import CaptureSource
+
+
+class ImageSequenceSource(CaptureSource):
+    """Recorded run stored as a directory of numbered .png, .jpg or .npy frames"""
+    extensions = (".png", ".jpg", ".npy")
+
+    def __init__(self, path, realtime=True, fps=60.0):
+        CaptureSource.__init__(self, realtime)
+
+        self.path = path
+        self.fps = fps
+        self.files = None
+        self.index = 0
+        self.start_time = 0.0
+
+    def open(self):
+        try:
+            files = sorted(f for f in os.listdir(self.path) if f.lower().endswith(self.extensions))
+        except Exception as e:
+            logging.exception(f"Error listing image sequence \"{self.path}\": {e}")
+            return False
+
+        if len(files) == 0:
+            logging.error(f"No .png, .jpg or .npy frames found in \"{self.path}\"")
+            return False
+
+        self.files = [os.path.join(self.path, f) for f in files]
+        self.index = 0
+        self.finished = False
+        self.start_time = time.monotonic()
+        return True
+
+    def is_opened(self):
+        return self.files is not None
+
+    def read(self):
+        if self.index >= len(self.files):
+            self.finished = True
+            return False, None
+
+        self.pace()
+
+        path = self.files[self.index]
+        self.index += 1
+
+        try:
+            # .npy frames are expected in the same BGR channel order as .png frames
+            if path.lower().endswith(".npy"):
+                frame = np.load(path)
+            else:
+                frame = cv2.imread(path, cv2.IMREAD_COLOR)
+        except Exception as e:
+            logging.exception(f"Error reading frame \"{path}\": {e}")
+            return False, None
+
+        return frame is not None, frame
+
+    def get_frame_time(self):
+        # Media time, so replays behave the same no matter how fast they are processed
+        index = self.index - 1
+        return self.start_time + index / self.fps, index
+
+    def release(self):
+        self.files = None
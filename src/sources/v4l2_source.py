@@ -0,0 +1,459 @@
+import ctypes
+import fcntl
+import logging
+import mmap
+import os
+import select
+import time
+
+import numpy as np
+
+from src.sources.capture_source import CaptureSource
+
+
+def v4l2_ioc(direction, nr, size):
+    return (direction << 30) | (size << 16) | (ord('V') << 8) | nr
+
+
+def fourcc(code):
+    return ord(code[0]) | (ord(code[1]) << 8) | (ord(code[2]) << 16) | (ord(code[3]) << 24)
+
+
+def fourcc_name(value):
+    return "".join(chr((value >> shift) & 0xFF) for shift in (0, 8, 16, 24))
+
+
+class v4l2_capability(ctypes.Structure):
+    _fields_ = [
+        ("driver", ctypes.c_char * 16),
+        ("card", ctypes.c_char * 32),
+        ("bus_info", ctypes.c_char * 32),
+        ("version", ctypes.c_uint32),
+        ("capabilities", ctypes.c_uint32),
+        ("device_caps", ctypes.c_uint32),
+        ("reserved", ctypes.c_uint32 * 3),
+    ]
+
+
+class v4l2_fmtdesc(ctypes.Structure):
+    _fields_ = [
+        ("index", ctypes.c_uint32),
+        ("type", ctypes.c_uint32),
+        ("flags", ctypes.c_uint32),
+        ("description", ctypes.c_char * 32),
+        ("pixelformat", ctypes.c_uint32),
+        ("mbus_code", ctypes.c_uint32),
+        ("reserved", ctypes.c_uint32 * 3),
+    ]
+
+
+class v4l2_frmsize_discrete(ctypes.Structure):
+    _fields_ = [("width", ctypes.c_uint32), ("height", ctypes.c_uint32)]
+
+
+class v4l2_frmsize_stepwise(ctypes.Structure):
+    _fields_ = [
+        ("min_width", ctypes.c_uint32),
+        ("max_width", ctypes.c_uint32),
+        ("step_width", ctypes.c_uint32),
+        ("min_height", ctypes.c_uint32),
+        ("max_height", ctypes.c_uint32),
+        ("step_height", ctypes.c_uint32),
+    ]
+
+
+class v4l2_frmsize_union(ctypes.Union):
+    _fields_ = [("discrete", v4l2_frmsize_discrete), ("stepwise", v4l2_frmsize_stepwise)]
+
+
+class v4l2_frmsizeenum(ctypes.Structure):
+    _anonymous_ = ("size",)
+    _fields_ = [
+        ("index", ctypes.c_uint32),
+        ("pixel_format", ctypes.c_uint32),
+        ("type", ctypes.c_uint32),
+        ("size", v4l2_frmsize_union),
+        ("reserved", ctypes.c_uint32 * 2),
+    ]
+
+
+class v4l2_fract(ctypes.Structure):
+    _fields_ = [("numerator", ctypes.c_uint32), ("denominator", ctypes.c_uint32)]
+
+
+class v4l2_frmival_stepwise(ctypes.Structure):
+    _fields_ = [("min", v4l2_fract), ("max", v4l2_fract), ("step", v4l2_fract)]
+
+
+class v4l2_frmival_union(ctypes.Union):
+    _fields_ = [("discrete", v4l2_fract), ("stepwise", v4l2_frmival_stepwise)]
+
+
+class v4l2_frmivalenum(ctypes.Structure):
+    _anonymous_ = ("interval",)
+    _fields_ = [
+        ("index", ctypes.c_uint32),
+        ("pixel_format", ctypes.c_uint32),
+        ("width", ctypes.c_uint32),
+        ("height", ctypes.c_uint32),
+        ("type", ctypes.c_uint32),
+        ("interval", v4l2_frmival_union),
+        ("reserved", ctypes.c_uint32 * 2),
+    ]
+
+
+class v4l2_pix_format(ctypes.Structure):
+    _fields_ = [
+        ("width", ctypes.c_uint32),
+        ("height", ctypes.c_uint32),
+        ("pixelformat", ctypes.c_uint32),
+        ("field", ctypes.c_uint32),
+        ("bytesperline", ctypes.c_uint32),
+        ("sizeimage", ctypes.c_uint32),
+        ("colorspace", ctypes.c_uint32),
+        ("priv", ctypes.c_uint32),
+        ("flags", ctypes.c_uint32),
+        ("ycbcr_enc", ctypes.c_uint32),
+        ("quantization", ctypes.c_uint32),
+        ("xfer_func", ctypes.c_uint32),
+    ]
+
+
+class v4l2_format_union(ctypes.Union):
+    # The kernel union contains pointers, the void pointer member reproduces its alignment
+    _fields_ = [("pix", v4l2_pix_format), ("raw_data", ctypes.c_uint8 * 200), ("align", ctypes.c_void_p)]
+
+
+class v4l2_format(ctypes.Structure):
+    _fields_ = [("type", ctypes.c_uint32), ("fmt", v4l2_format_union)]
+
+
+class v4l2_captureparm(ctypes.Structure):
+    _fields_ = [
+        ("capability", ctypes.c_uint32),
+        ("capturemode", ctypes.c_uint32),
+        ("timeperframe", v4l2_fract),
+        ("extendedmode", ctypes.c_uint32),
+        ("readbuffers", ctypes.c_uint32),
+        ("reserved", ctypes.c_uint32 * 4),
+    ]
+
+
+class v4l2_streamparm_union(ctypes.Union):
+    _fields_ = [("capture", v4l2_captureparm), ("raw_data", ctypes.c_uint8 * 200)]
+
+
+class v4l2_streamparm(ctypes.Structure):
+    _fields_ = [("type", ctypes.c_uint32), ("parm", v4l2_streamparm_union)]
+
+
+class v4l2_requestbuffers(ctypes.Structure):
+    _fields_ = [
+        ("count", ctypes.c_uint32),
+        ("type", ctypes.c_uint32),
+        ("memory", ctypes.c_uint32),
+        ("reserved", ctypes.c_uint32 * 2),
+    ]
+
+
+class timeval(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_usec", ctypes.c_long)]
+
+
+class v4l2_timecode(ctypes.Structure):
+    _fields_ = [
+        ("type", ctypes.c_uint32),
+        ("flags", ctypes.c_uint32),
+        ("frames", ctypes.c_uint8),
+        ("seconds", ctypes.c_uint8),
+        ("minutes", ctypes.c_uint8),
+        ("hours", ctypes.c_uint8),
+        ("userbits", ctypes.c_uint8 * 4),
+    ]
+
+
+class v4l2_buffer_m(ctypes.Union):
+    _fields_ = [
+        ("offset", ctypes.c_uint32),
+        ("userptr", ctypes.c_ulong),
+        ("planes", ctypes.c_void_p),
+        ("fd", ctypes.c_int32),
+    ]
+
+
+class v4l2_buffer(ctypes.Structure):
+    _fields_ = [
+        ("index", ctypes.c_uint32),
+        ("type", ctypes.c_uint32),
+        ("bytesused", ctypes.c_uint32),
+        ("flags", ctypes.c_uint32),
+        ("field", ctypes.c_uint32),
+        ("timestamp", timeval),
+        ("timecode", v4l2_timecode),
+        ("sequence", ctypes.c_uint32),
+        ("memory", ctypes.c_uint32),
+        ("m", v4l2_buffer_m),
+        ("length", ctypes.c_uint32),
+        ("reserved2", ctypes.c_uint32),
+        ("request_fd", ctypes.c_int32),
+    ]
+
+
+VIDIOC_QUERYCAP = v4l2_ioc(2, 0, ctypes.sizeof(v4l2_capability))
+VIDIOC_ENUM_FMT = v4l2_ioc(3, 2, ctypes.sizeof(v4l2_fmtdesc))
+VIDIOC_S_FMT = v4l2_ioc(3, 5, ctypes.sizeof(v4l2_format))
+VIDIOC_REQBUFS = v4l2_ioc(3, 8, ctypes.sizeof(v4l2_requestbuffers))
+VIDIOC_QUERYBUF = v4l2_ioc(3, 9, ctypes.sizeof(v4l2_buffer))
+VIDIOC_QBUF = v4l2_ioc(3, 15, ctypes.sizeof(v4l2_buffer))
+VIDIOC_DQBUF = v4l2_ioc(3, 17, ctypes.sizeof(v4l2_buffer))
+VIDIOC_STREAMON = v4l2_ioc(1, 18, ctypes.sizeof(ctypes.c_int))
+VIDIOC_STREAMOFF = v4l2_ioc(1, 19, ctypes.sizeof(ctypes.c_int))
+VIDIOC_S_PARM = v4l2_ioc(3, 22, ctypes.sizeof(v4l2_streamparm))
+VIDIOC_ENUM_FRAMESIZES = v4l2_ioc(3, 74, ctypes.sizeof(v4l2_frmsizeenum))
+VIDIOC_ENUM_FRAMEINTERVALS = v4l2_ioc(3, 75, ctypes.sizeof(v4l2_frmivalenum))
+
+V4L2_BUF_TYPE_VIDEO_CAPTURE = 1
+V4L2_MEMORY_MMAP = 1
+V4L2_FIELD_ANY = 0
+V4L2_CAP_VIDEO_CAPTURE = 0x00000001
+V4L2_CAP_STREAMING = 0x04000000
+V4L2_CAP_DEVICE_CAPS = 0x80000000
+V4L2_FRMSIZE_TYPE_DISCRETE = 1
+V4L2_FRMIVAL_TYPE_DISCRETE = 1
+V4L2_BUF_FLAG_TIMESTAMP_MASK = 0xE000
+V4L2_BUF_FLAG_TIMESTAMP_MONOTONIC = 0x2000
+
+V4L2_PIX_FMT_YUYV = fourcc("YUYV")
+V4L2_PIX_FMT_MJPEG = fourcc("MJPG")
+
+# Formats we can consume, cheapest first: YUYV needs no decoding at all
+PREFERRED_FORMATS = [(V4L2_PIX_FMT_YUYV, "yuyv"), (V4L2_PIX_FMT_MJPEG, "jpeg")]
+
+# Capabilities per device path, probed once per session
+capability_cache = {}
+
+
+def ioctl_enum(fd, request, struct):
+    """Run an enumeration ioctl, returning False once the index runs past the last entry"""
+    try:
+        fcntl.ioctl(fd, request, struct)
+        return True
+    except OSError:
+        return False
+
+
+def probe_capabilities(fd):
+    """Enumerate every pixel format, frame size and frame rate of a device"""
+    formats = {}
+
+    fmtdesc = v4l2_fmtdesc(type=V4L2_BUF_TYPE_VIDEO_CAPTURE)
+    while ioctl_enum(fd, VIDIOC_ENUM_FMT, fmtdesc):
+        sizes = {}
+
+        frmsize = v4l2_frmsizeenum(pixel_format=fmtdesc.pixelformat)
+        while ioctl_enum(fd, VIDIOC_ENUM_FRAMESIZES, frmsize):
+            if frmsize.type == V4L2_FRMSIZE_TYPE_DISCRETE:
+                size_list = [(frmsize.discrete.width, frmsize.discrete.height)]
+            else:
+                # Stepwise or continuous sizes, only the native NSMBW size is interesting
+                stepwise = frmsize.stepwise
+                size_list = []
+                if stepwise.min_width <= 640 <= stepwise.max_width and stepwise.min_height <= 480 <= stepwise.max_height:
+                    size_list.append((640, 480))
+
+            for width, height in size_list:
+                sizes[(width, height)] = probe_frame_rates(fd, fmtdesc.pixelformat, width, height)
+
+            if frmsize.type != V4L2_FRMSIZE_TYPE_DISCRETE:
+                break
+            frmsize.index += 1
+
+        formats[fmtdesc.pixelformat] = sizes
+        fmtdesc.index += 1
+
+    return formats
+
+
+def probe_frame_rates(fd, pixel_format, width, height):
+    rates = []
+
+    frmival = v4l2_frmivalenum(pixel_format=pixel_format, width=width, height=height)
+    while ioctl_enum(fd, VIDIOC_ENUM_FRAMEINTERVALS, frmival):
+        if frmival.type == V4L2_FRMIVAL_TYPE_DISCRETE:
+            interval = frmival.discrete
+        else:
+            # Stepwise intervals, the minimum interval is the highest frame rate
+            interval = frmival.stepwise.min
+        if interval.numerator > 0:
+            rates.append(interval.denominator / interval.numerator)
+
+        if frmival.type != V4L2_FRMIVAL_TYPE_DISCRETE:
+            break
+        frmival.index += 1
+
+    return rates
+
+
+class V4L2Source(CaptureSource):
+    """Native Linux capture device read from memory mapped kernel buffers"""
+    def __init__(self, index, width=640, height=480, fps=60, buffer_count=4):
+        CaptureSource.__init__(self, realtime=True)
+
+        self.index = index
+        self.path = f"/dev/video{index}"
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.buffer_count = buffer_count
+
+        self.fd = None
+        self.buffers = []
+        self.queued_buffer = None  # Buffer handed out by the previous read, requeued on the next one
+        # Row length in bytes the driver settled on, rows may be padded past width * 2
+        self.bytes_per_line = width * 2
+        self.streaming = False
+
+        # Kernel timestamp and sequence number of the last dequeued buffer
+        self.last_timestamp = 0.0
+        self.last_sequence = 0
+
+    @staticmethod
+    def is_available(index):
+        return os.path.exists(f"/dev/video{index}")
+
+    def open(self):
+        try:
+            self.fd = os.open(self.path, os.O_RDWR | os.O_NONBLOCK)
+
+            capability = v4l2_capability()
+            fcntl.ioctl(self.fd, VIDIOC_QUERYCAP, capability)
+            caps = capability.device_caps if capability.capabilities & V4L2_CAP_DEVICE_CAPS else capability.capabilities
+            if not caps & V4L2_CAP_VIDEO_CAPTURE or not caps & V4L2_CAP_STREAMING:
+                logging.error(f"{self.path} doesn't support streaming video capture")
+                self.release()
+                return False
+
+            if self.path not in capability_cache:
+                capability_cache[self.path] = probe_capabilities(self.fd)
+                logging.info(f"Probed {self.path} ({capability.card.decode(errors='ignore')}): "
+                             f"{[fourcc_name(f) for f in capability_cache[self.path]]}")
+
+            if not self.negotiate_format(capability_cache[self.path]):
+                logging.error(f"{self.path} supports neither YUYV nor MJPG at {self.width}x{self.height}")
+                self.release()
+                return False
+
+            self.map_buffers()
+            fcntl.ioctl(self.fd, VIDIOC_STREAMON, ctypes.c_int(V4L2_BUF_TYPE_VIDEO_CAPTURE))
+            self.streaming = True
+        except Exception as e:
+            logging.exception(f"Error opening V4L2 device {self.path}: {e}")
+            self.release()
+            return False
+
+        return True
+
+    def negotiate_format(self, formats):
+        """Pick the cheapest supported format at the native size and the closest frame rate to the target"""
+        for pixel_format, name in PREFERRED_FORMATS:
+            rates = formats.get(pixel_format, {}).get((self.width, self.height))
+            if rates is None:
+                continue
+
+            fmt = v4l2_format(type=V4L2_BUF_TYPE_VIDEO_CAPTURE)
+            fmt.fmt.pix.width = self.width
+            fmt.fmt.pix.height = self.height
+            fmt.fmt.pix.pixelformat = pixel_format
+            fmt.fmt.pix.field = V4L2_FIELD_ANY
+            fcntl.ioctl(self.fd, VIDIOC_S_FMT, fmt)
+
+            if fmt.fmt.pix.pixelformat != pixel_format or fmt.fmt.pix.width != self.width or fmt.fmt.pix.height != self.height:
+                continue
+
+            # Only set the frame rate when the device reports one it can do
+            if len(rates) > 0:
+                fps = min(rates, key=lambda rate: abs(rate - self.fps))
+                parm = v4l2_streamparm(type=V4L2_BUF_TYPE_VIDEO_CAPTURE)
+                parm.parm.capture.timeperframe.numerator = 1000
+                parm.parm.capture.timeperframe.denominator = int(round(fps * 1000))
+                try:
+                    fcntl.ioctl(self.fd, VIDIOC_S_PARM, parm)
+                    self.fps = fps
+                except OSError:
+                    pass
+
+            self.bytes_per_line = fmt.fmt.pix.bytesperline or self.width * 2
+            self.pixel_format = name
+            return True
+
+        return False
+
+    def map_buffers(self):
+        request = v4l2_requestbuffers(count=self.buffer_count, type=V4L2_BUF_TYPE_VIDEO_CAPTURE, memory=V4L2_MEMORY_MMAP)
+        fcntl.ioctl(self.fd, VIDIOC_REQBUFS, request)
+
+        for index in range(request.count):
+            buffer = v4l2_buffer(index=index, type=V4L2_BUF_TYPE_VIDEO_CAPTURE, memory=V4L2_MEMORY_MMAP)
+            fcntl.ioctl(self.fd, VIDIOC_QUERYBUF, buffer)
+            self.buffers.append(mmap.mmap(self.fd, buffer.length, mmap.MAP_SHARED,
+                                          mmap.PROT_READ | mmap.PROT_WRITE, offset=buffer.m.offset))
+            fcntl.ioctl(self.fd, VIDIOC_QBUF, buffer)
+
+    def is_opened(self):
+        return self.streaming
+
+    def read(self):
+        """Dequeue the next filled buffer and return a view of it, valid until the next read"""
+        if self.queued_buffer is not None:
+            fcntl.ioctl(self.fd, VIDIOC_QBUF, self.queued_buffer)
+            self.queued_buffer = None
+
+        readable, _, _ = select.select([self.fd], [], [], 1.0)
+        if not readable:
+            return False, None
+
+        buffer = v4l2_buffer(type=V4L2_BUF_TYPE_VIDEO_CAPTURE, memory=V4L2_MEMORY_MMAP)
+        try:
+            fcntl.ioctl(self.fd, VIDIOC_DQBUF, buffer)
+        except BlockingIOError:
+            return False, None
+        self.queued_buffer = buffer
+
+        # Kernel timestamps are taken when the frame was captured, which is better than our arrival time
+        if buffer.flags & V4L2_BUF_FLAG_TIMESTAMP_MASK == V4L2_BUF_FLAG_TIMESTAMP_MONOTONIC:
+            self.last_timestamp = buffer.timestamp.tv_sec + buffer.timestamp.tv_usec / 1e6
+        else:
+            self.last_timestamp = time.monotonic()
+        self.last_sequence = buffer.sequence
+
+        if self.pixel_format == "yuyv":
+            # Cut the row padding off, the strided view is copied into the ring buffer by the capture thread
+            data = np.frombuffer(self.buffers[buffer.index], dtype=np.uint8, count=self.bytes_per_line * self.height)
+            return True, data.reshape(self.height, self.bytes_per_line)[:, :self.width * 2].reshape(self.height, self.width, 2)
+        return True, np.frombuffer(self.buffers[buffer.index], dtype=np.uint8, count=buffer.bytesused)
+
+    def get_frame_time(self):
+        return self.last_timestamp, self.last_sequence
+
+    def release(self):
+        if self.fd is None:
+            return
+
+        try:
+            if self.streaming:
+                fcntl.ioctl(self.fd, VIDIOC_STREAMOFF, ctypes.c_int(V4L2_BUF_TYPE_VIDEO_CAPTURE))
+        except OSError as e:
+            logging.exception(e)
+        self.streaming = False
+        self.queued_buffer = None
+
+        for buffer in self.buffers:
+            try:
+                buffer.close()
+            except BufferError:
+                # A frame view is still referenced somewhere, the mapping goes away with it
+                pass
+        self.buffers = []
+
+        os.close(self.fd)
+        self.fd = None
@@ -0,0 +1,60 @@
+import logging
+import time
+
+import cv2
+
+from src.sources.capture_source import CaptureSource
+
+
+class VideoFileSource(CaptureSource):
+    """Recorded run read from a video file"""
+    def __init__(self, path, realtime=True):
+        CaptureSource.__init__(self, realtime)
+
+        self.path = path
+        self.video = None
+        self.start_time = 0.0
+        self.frames_read = 0
+
+    def open(self):
+        try:
+            video = cv2.VideoCapture(self.path)
+            if not video.isOpened():
+                logging.error(f"Can't open video file \"{self.path}\"")
+                return False
+        except Exception as e:
+            logging.exception(f"Error opening video file \"{self.path}\": {e}")
+            return False
+
+        # Fall back to 60fps if the container doesn't store a frame rate
+        fps = video.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if fps and fps > 0 else 60.0
+
+        self.video = video
+        self.finished = False
+        self.start_time = time.monotonic()
+        self.frames_read = 0
+        return True
+
+    def is_opened(self):
+        return self.video is not None and self.video.isOpened()
+
+    def read(self):
+        self.pace()
+
+        retval, frame = self.video.read()
+        if not retval:
+            self.finished = True
+        else:
+            self.frames_read += 1
+        return retval, frame
+
+    def get_frame_time(self):
+        # Media time, so replays behave the same no matter how fast they are processed
+        index = self.frames_read - 1
+        return self.start_time + index / self.fps, index
+
+    def release(self):
+        if self.video is not None:
+            self.video.release()
+            self.video = None
@@ -0,0 +1,131 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+
+class NullSpan:
+    """Span returned while tracing is off, entering and leaving it does nothing"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+null_span = NullSpan()
+
+
+class Span:
+    """Times a block of code on the current thread and hands the result to the tracer"""
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = time.perf_counter_ns()
+        self.tracer.record(self.name, self.start, end - self.start, self.args)
+        return False
+
+
+class Tracer:
+    """Collects spans from every thread and streams them to a Chrome trace file in the background"""
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.events = queue.SimpleQueue()  # (name, start ns, duration ns, thread id, args), None to stop
+        self.thread_names = {}
+        self.writer = None
+        self.pid = os.getpid()
+
+    def start(self, path):
+        """Start writing spans to a trace file that chrome://tracing and Perfetto can open"""
+        if self.enabled:
+            self.stop()
+
+        self.path = path
+        self.writer = threading.Thread(target=self.write_loop, args=(path,), name="TraceWriter", daemon=True)
+        self.writer.start()
+        self.enabled = True
+        logging.info(f"Tracing to \"{path}\"")
+
+    def stop(self):
+        """Stop tracing and wait for everything recorded so far to be written"""
+        if not self.enabled:
+            return
+
+        self.enabled = False
+        self.events.put(None)
+        self.writer.join(5)
+        self.writer = None
+
+    def span(self, name, args=None):
+        """Time a with block, costs one attribute check while tracing is off"""
+        if not self.enabled:
+            return null_span
+        return Span(self, name, args)
+
+    def instant(self, name, args=None):
+        """Mark a single moment, like a LiveSplit command being queued"""
+        if self.enabled:
+            self.record(name, time.perf_counter_ns(), None, args)
+
+    def record(self, name, start, duration, args):
+        thread_id = threading.get_ident()
+        if thread_id not in self.thread_names:
+            self.thread_names[thread_id] = threading.current_thread().name
+        self.events.put((name, start, duration, thread_id, args))
+
+    def write_loop(self, path):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "w") as file:
+                # The closing bracket is optional, so a trace cut short by a crash still opens
+                file.write("[\n")
+                file.write(json.dumps({"name": "process_name", "ph": "M", "pid": self.pid, "tid": 0,
+                                       "args": {"name": "NSMBW AutoSplit"}}))
+                named_threads = set()
+
+                while True:
+                    event = self.events.get()
+                    if event is None:
+                        break
+
+                    name, start, duration, thread_id, args = event
+                    if thread_id not in named_threads:
+                        named_threads.add(thread_id)
+                        file.write(",\n" + json.dumps({"name": "thread_name", "ph": "M", "pid": self.pid,
+                                                       "tid": thread_id,
+                                                       "args": {"name": self.thread_names.get(thread_id, "")}}))
+
+                    # Chrome traces count in microseconds
+                    trace_event = {"name": name, "pid": self.pid, "tid": thread_id, "ts": start / 1000}
+                    if duration is None:
+                        trace_event["ph"] = "i"
+                        trace_event["s"] = "t"
+                    else:
+                        trace_event["ph"] = "X"
+                        trace_event["dur"] = duration / 1000
+                    if args:
+                        trace_event["args"] = args
+                    file.write(",\n" + json.dumps(trace_event, default=str))
+
+                file.write("\n]\n")
+            print(f"Saved trace to \"{path}\"")
+        except Exception as e:
+            self.enabled = False
+            logging.exception(f"Error writing trace to \"{path}\": {e}")
+
+
+# Shared by every module so one switch turns all spans on or off
+tracer = Tracer()
@@ -1,15 +1,32 @@
-import logging
-import time
+import threading
 
 import cv2
 
-from PyQt5.QtMultimedia import QCameraInfo
-from PyQt5.QtCore import QObject, QThread, pyqtSignal
+from src.capture_worker import FrameRingBuffer, CaptureThread, CaptureProcess
+from src.config import Config
+from src.replay_buffer import ReplayBuffer
+from src.sources import open_source
 
 
-class VideoCapture(QObject):
-    sig_device_list_updated = pyqtSignal()
+class DuplicateFrameFilter:
+    """Flags frames that repeat the previous one, e.g. 30fps gameplay captured at 60fps"""
+    def __init__(self, tolerance=6):
+        # Largest per pixel difference on the 32x24 thumbnail still treated as capture noise
+        self.tolerance = tolerance
+        self.prev_thumbnail = None
 
+    def check(self, frame):
+        thumbnail = frame.get_gray_thumbnail()
+        duplicate = (self.prev_thumbnail is not None and
+                     cv2.absdiff(thumbnail, self.prev_thumbnail).max() <= self.tolerance)
+        self.prev_thumbnail = thumbnail
+        return duplicate
+
+    def reset(self):
+        self.prev_thumbnail = None
+
+
+class VideoCapture:
     instance = None
     initialized = False
 
@@ -19,129 +36,148 @@ class VideoCapture(QObject):
         return VideoCapture.instance
 
     def __init__(self):
-        super(VideoCapture, self).__init__()
-
         if not VideoCapture.initialized:
             VideoCapture.initialized = True
+            # Capture device names by index, filled in by the UI which can enumerate cameras
             self.device_list = {}
-            self.capture_device = None
-            self.device_list_worker = None
+            self.capture_source = None
             self.current_device_index = -1
 
-    def get_device_list(self):
-        return self.device_list
+            self.ring_buffer = FrameRingBuffer()
+            self.capture_thread = None
+            self.wake_event = threading.Event()
+            self.skipped_frames = 0
+            self.dropped_frames = 0
+            self.last_seq = -1
 
-    def update_device_list(self):
-        self.device_list_worker = DeviceListWorker()
-        self.device_list_worker.sig_device_list_updated.connect(self.device_list_updated)
-        self.device_list_worker.start()
+            self.duplicate_filter = DuplicateFrameFilter()
+            self.duplicate_frames = 0
+            self.skip_duplicates = True
 
-    def device_list_updated(self, device_list):
-        self.device_list = device_list
-        self.sig_device_list_updated.emit()
-        print(self.device_list)
+            self.replay_buffer = None
+
+    def get_device_list(self):
+        return self.device_list
 
     def init_capture_device(self, index):
+        """Open a capture device index, a recorded video file or a directory of frames"""
         # If trying to initialize the same device, do nothing
-        if self.current_device_index == index and self.capture_device is not None:
-            if self.capture_device.isOpened():
+        if self.current_device_index == index and self.capture_thread is not None:
+            if self.capture_thread.is_alive():
                 return True
-        
-        # Release previous device
-        if self.capture_device is not None:
-            self.capture_device.release()
-            self.capture_device = None
-
-        try:
-            # Try different backends if DSHOW fails
-            capture_device = cv2.VideoCapture(index, cv2.CAP_DSHOW)
-            
-            # If DSHOW fails, try default backend
-            if not capture_device.isOpened():
-                capture_device = cv2.VideoCapture(index)
-                
-            if capture_device is None or not capture_device.isOpened():
-                logging.error(f"Can't open capture device at index {index}")
-                return False
-                
-            # Test if we can actually read a frame
-            retval, test_frame = capture_device.read()
-            if not retval or test_frame is None:
-                logging.error(f"Capture device at index {index} is not providing frames")
-                capture_device.release()
+
+        # Release previous source
+        self.release()
+
+        realtime = Config.get_key("replay_realtime", True)
+        # Raw MJPEG saves most of the decode but gives block averaged thumbnails, see Frame.get_gray_thumbnail()
+        raw_mjpeg = Config.get_key("raw_mjpeg", False)
+        v4l2 = Config.get_key("v4l2_backend", True)
+
+        if Config.get_key("capture_process", False):
+            # Capture in a child process so decoding never waits on the GIL
+            capture_process = CaptureProcess(index, realtime, raw_mjpeg, v4l2)
+            if not capture_process.start():
                 return False
 
-        except Exception as e:
-            logging.exception(f"Error initializing capture device at index {index}: {e}")
-            return False
+            self.ring_buffer = capture_process.ring_buffer
+            self.capture_thread = capture_process
+            self.reset_frame_counters()
+            self.wake_event.set()
+        else:
+            source = open_source(index, realtime, raw_mjpeg, v4l2)
+            if source is None or not self.init_capture_source(source):
+                return False
 
-        try:
-            # Set frame width to 640 (4:3 aspect ratio for NSMBW)
-            capture_device.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            # Set frame height to 480
-            capture_device.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            # Set framerate to 30fps for NSMBW (minimum) and allow up to 60fps
-            capture_device.set(cv2.CAP_PROP_FPS, 60)
-            # Set buffer size to minimize latency
-            capture_device.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-            # Set fourcc codec for better compatibility
-            capture_device.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc('M', 'J', 'P', 'G'))
-        except Exception as e:
-            logging.exception(f"Error setting capture device properties: {e}")
-            # Continue even if properties can't be set
-
-        self.capture_device = capture_device
         self.current_device_index = index
         return True
 
-    def get_frame(self):
-        if self.capture_device is None or not self.capture_device.isOpened():
-            time.sleep(0.033)  # ~30fps delay
-            return False, None
-
-        try:
-            retval, frame = self.capture_device.read()
-            if not retval or frame is None or frame.size == 0:
-                return False, None
+    def init_capture_source(self, source):
+        """Start capturing from an already created source in a thread of this process"""
+        # Release previous source
+        self.release()
 
-            # Ensure frame has valid dimensions
-            if frame.shape[0] == 0 or frame.shape[1] == 0:
-                return False, None
+        if not source.is_opened() and not source.open():
+            return False
 
-            # Convert from BGR to RGB for display
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        self.capture_source = source
 
-        except Exception as e:
-            logging.exception(f"Error reading frame from capture device: {e}")
-            return False, None
+        # Start grabbing frames in the background
+        self.ring_buffer = FrameRingBuffer()
+        self.capture_thread = CaptureThread(self.capture_source, self.ring_buffer)
+        self.capture_thread.start()
+        self.reset_frame_counters()
+        self.wake_event.set()
+        return True
 
-        return retval, frame
+    def reset_frame_counters(self):
+        self.duplicate_filter.reset()
+        self.skip_duplicates = Config.get_key("skip_duplicate_frames", True)
+        self.last_seq = -1
+
+        # Sequence numbers restart with the source, so older replay frames can't be matched to states
+        replay_seconds = Config.get_key("replay_buffer_seconds", 10)
+        if replay_seconds > 0:
+            max_bytes = Config.get_key("replay_buffer_max_mb", 64) * 1024 * 1024
+            if self.replay_buffer is None:
+                self.replay_buffer = ReplayBuffer(replay_seconds, max_bytes)
+            self.replay_buffer.seconds = replay_seconds
+            self.replay_buffer.max_bytes = max_bytes
+            self.replay_buffer.clear()
+        else:
+            self.replay_buffer = None
+
+    def get_frame(self, timeout=0.1):
+        """Get the newest captured frame and the number of frames skipped since the previous call"""
+        if self.capture_thread is None:
+            self.wait_for_wake(timeout)
+            return False, None, 0
+
+        # A finished source can still have its last frame waiting in the ring buffer
+        if not self.capture_thread.is_alive():
+            timeout = 0
+
+        retval, frame, skipped = self.ring_buffer.read_latest(timeout)
+        if not retval:
+            if timeout == 0:
+                self.wait_for_wake(0.1)
+            return False, None, 0
+
+        # Any gap in sequence numbers not caused by skipping was dropped during capture
+        frame.dropped = max(frame.seq - self.last_seq - 1 - skipped, 0)
+        self.last_seq = frame.seq
+
+        # Detectors reuse their previous results for repeated frames
+        if self.skip_duplicates:
+            frame.duplicate = self.duplicate_filter.check(frame)
+            if frame.duplicate:
+                self.duplicate_frames += 1
+
+        if self.replay_buffer is not None:
+            self.replay_buffer.add(frame)
+
+        self.skipped_frames += skipped
+        self.dropped_frames += frame.dropped
+        return retval, frame, skipped
+
+    def wait_for_wake(self, timeout):
+        """Block until a source is started or interrupt() is called"""
+        if self.wake_event.wait(timeout):
+            self.wake_event.clear()
+
+    def interrupt(self):
+        """Make a pending get_frame() return early so the caller can handle a control event"""
+        self.wake_event.set()
+        self.ring_buffer.interrupt()
 
     def release(self):
-        if self.capture_device is not None:
-            self.capture_device.release()
-            self.capture_device = None
+        # Stop the capture thread or process before the source is released underneath it
+        if self.capture_thread is not None:
+            self.ring_buffer.interrupt()
+            self.capture_thread.stop()
+            self.capture_thread = None
             self.current_device_index = -1
 
-
-class DeviceListWorker(QThread):
-    sig_device_list_updated = pyqtSignal(dict)
-
-    def __init__(self):
-        QThread.__init__(self)
-
-        self.device_list = {}
-
-    def run(self):
-        self.update_device_list()
-        self.sig_device_list_updated.emit(self.device_list)
-
-    def update_device_list(self):
-        try:
-            self.device_list.clear()
-            index = 0
-            for camera_info in QCameraInfo.availableCameras():
-                self.device_list[str(index)] = camera_info.description()
-                index += 1
-        except Exception as e:
-            logging.exception(e)
\ No newline at end of file
+        if self.capture_source is not None:
+            self.capture_source.release()
+            self.capture_source = None
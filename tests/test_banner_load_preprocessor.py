@@ -0,0 +1,75 @@
+import unittest
+
+import cv2
+import numpy as np
+
+from src.classifiers.banner_load_preprocessor import fill_convex_hull
+
+
+def contour_hull(image):
+    """Hull the way the banner preprocessor used to build it, from every contour point and drawContours"""
+    contours, hierarchy = cv2.findContours(image, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+    new_contours = []
+    for contour in contours:
+        for vector in contour:
+            new_contours.append(vector)
+    new_contours = np.asarray(new_contours)
+    new_contours = np.asarray([new_contours])
+
+    if len(new_contours[0]) > 0:
+        hull = [cv2.convexHull(new_contours[0], False)]
+        image = np.zeros((image.shape[0], image.shape[1]), np.uint8)
+        cv2.drawContours(image, hull, 0, (255, 255, 255), -1, 8)
+
+    _, image = cv2.threshold(image, 0, 1, cv2.THRESH_BINARY)
+    return image
+
+
+class FillConvexHullTest(unittest.TestCase):
+    shape = (24, 32)
+
+    def assert_same_hull(self, mask):
+        expected = contour_hull(mask.copy())
+        actual = fill_convex_hull(mask, np.full(self.shape, 7, np.uint8))
+        np.testing.assert_array_equal(actual, expected)
+
+    def test_empty(self):
+        self.assert_same_hull(np.zeros(self.shape, np.uint8))
+
+    def test_full(self):
+        self.assert_same_hull(np.ones(self.shape, np.uint8))
+
+    def test_single_pixels(self):
+        for y, x in [(0, 0), (23, 31), (0, 31), (12, 16)]:
+            mask = np.zeros(self.shape, np.uint8)
+            mask[y, x] = 1
+            self.assert_same_hull(mask)
+
+    def test_random(self):
+        rng = np.random.default_rng(0)
+        for i in range(2000):
+            mask = np.zeros(self.shape, np.uint8)
+            kind = i % 4
+            if kind == 0:
+                # Scattered pixels
+                for _ in range(rng.integers(1, 4)):
+                    mask[rng.integers(0, 24), rng.integers(0, 32)] = 1
+            elif kind == 1:
+                # Lines at any angle
+                for _ in range(rng.integers(1, 4)):
+                    start = (int(rng.integers(0, 32)), int(rng.integers(0, 24)))
+                    end = (int(rng.integers(0, 32)), int(rng.integers(0, 24)))
+                    cv2.line(mask, start, end, 1, 1)
+            elif kind == 2:
+                # Boxes, like a banner on a black screen
+                for _ in range(rng.integers(1, 4)):
+                    y, x = rng.integers(0, 24), rng.integers(0, 32)
+                    mask[y:y + rng.integers(1, 10), x:x + rng.integers(1, 15)] = 1
+            else:
+                # Noise from sparse to dense
+                mask = (rng.random(self.shape) < rng.random()).astype(np.uint8)
+            self.assert_same_hull(mask)
+
+
+if __name__ == "__main__":
+    unittest.main()
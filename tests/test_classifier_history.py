@@ -0,0 +1,54 @@
+import importlib.util
+import types
+import unittest
+
+import numpy as np
+
+from src.classifiers.fade_load_preprocessor import FadeLoadPreprocessor
+from src.frame import Frame
+
+
+class LoadModel:
+    """Stands in for an ONNX session that sees a load in every input"""
+    def __init__(self):
+        self.runs = 0
+
+    def get_inputs(self):
+        return [types.SimpleNamespace(name="input")]
+
+    def run(self, outputs, inputs):
+        self.runs += 1
+        return [np.asarray([[0.0, 1.0]], np.float32)]
+
+
+# Classifier imports onnxruntime to load its model
+@unittest.skipUnless(importlib.util.find_spec("onnxruntime"), "onnxruntime isn't installed")
+class ClassifierHistoryTest(unittest.TestCase):
+    def setUp(self):
+        from src.classifiers.classifier import Classifier
+
+        self.classifier = Classifier("missing.onnx", FadeLoadPreprocessor(), None, threshold=1)
+        self.model = LoadModel()
+        self.classifier.model = self.model
+
+    def update(self, seq):
+        frame = Frame(np.full((Frame.height, Frame.width, 3), 128, np.uint8), seq=seq, timestamp=seq / 60)
+        return self.classifier.update(frame)
+
+    def test_no_load_until_the_history_has_refilled(self):
+        length = self.classifier.preprocessing.history.length
+        for seq in range(length):
+            self.update(seq)
+        self.assertEqual(self.model.runs, 1)
+
+        # Leaving idle starts the history over, its all black zeros must not reach the model
+        self.classifier.reset()
+        for seq in range(length, 2 * length - 1):
+            self.assertFalse(self.update(seq))
+        self.assertEqual(self.model.runs, 1)
+        self.update(2 * length - 1)
+        self.assertEqual(self.model.runs, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
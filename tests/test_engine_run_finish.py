@@ -0,0 +1,58 @@
+import importlib.util
+import unittest
+
+import numpy as np
+
+from src.frame import Frame
+
+
+# The engine loads the ONNX classifiers and the route validates against its JSON schema
+@unittest.skipUnless(importlib.util.find_spec("onnxruntime") and importlib.util.find_spec("jsonschema"),
+                     "onnxruntime or jsonschema isn't installed")
+class EngineRunFinishTest(unittest.TestCase):
+    def setUp(self):
+        from src.engine import Engine
+        from src.replay_harness import RecordingLivesplit
+        from src.route import NSMBWRoute, NSMBWSplit, Component
+
+        self.livesplit = RecordingLivesplit(60)
+        self.engine = Engine(self.livesplit)
+        self.engine.set_route(NSMBWRoute(splits=[
+            NSMBWSplit("1-1", "level", [Component("1-1")], expected_loads=1),
+        ]))
+        self.engine.start_run()
+
+    def process(self, seq, **attributes):
+        frame = Frame(np.zeros((Frame.height, Frame.width, 3), np.uint8), seq=seq, timestamp=seq / 60)
+        for name, value in attributes.items():
+            setattr(frame, name, value)
+        self.livesplit.frame_index = seq
+        self.engine.update_state(frame)
+
+    def test_run_finished_during_load_ends_the_load(self):
+        for seq in range(60):
+            self.process(seq)
+        # The final load starts at frame 55 and the picture never comes back before the split
+        self.process(60, load_detected="banner_load", load_start_time=55 / 60)
+        for seq in range(61, 80):
+            self.process(seq)
+
+        self.assertTrue(self.engine.wait_for_reset)
+        self.assertFalse(self.engine.is_in_load_state)
+        commands = [command for command, _ in self.livesplit.commands]
+        self.assertLess(commands.index("unpausegametime"), commands.index("split"))
+        # Loading from the load's start until the frame the run finished on
+        self.assertAlmostEqual(self.livesplit.loading_times, (70 - 55) / 60)
+
+    def test_finished_run_is_idle_whatever_load_state_is_left(self):
+        self.engine.next_split()
+        self.engine.is_in_load_state = True
+        self.engine.load_start_time = 1.0
+        self.engine.update_detector_plan()
+
+        self.assertEqual(self.engine.detector_plan["mode"], "idle")
+        self.assertIsNone(self.engine.detector_plan["load_exit"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import importlib.util
+import types
+import unittest
+
+import numpy as np
+
+from src.detector_plan import LoadStep
+from src.frame import Frame
+
+
+def make_frame(timestamp, black_fraction):
+    """Gray frame with the top black_fraction of its rows black"""
+    image = np.full((Frame.height, Frame.width, 3), 128, np.uint8)
+    image[:int(Frame.height * black_fraction)] = 0
+    return Frame(image, timestamp=timestamp)
+
+
+# Importing anything from src.detectors loads the ONNX classifiers
+@unittest.skipUnless(importlib.util.find_spec("onnxruntime"), "onnxruntime isn't installed")
+class LoadEntryDetectorTest(unittest.TestCase):
+    def setUp(self):
+        from src.detectors.load_entry_detector import LoadEntryDetector
+
+        self.detector = LoadEntryDetector()
+        self.classifier = types.SimpleNamespace(positive_since=None)
+        self.step = LoadStep("banner_load", None, None, self.classifier)
+
+    def feed(self, start, count, black_fraction):
+        for i in range(count):
+            self.detector.update(make_frame(start + i / 60, black_fraction))
+
+    def test_load_starts_at_dark_onset(self):
+        self.feed(0.0, 30, 0.0)
+        self.feed(0.5, 20, 1.0)
+        self.classifier.positive_since = 0.6
+        self.assertEqual(self.step.get_load_start(make_frame(0.8, 1.0), self.detector), 0.5)
+
+    def test_falls_back_to_classifier_without_dark_onset(self):
+        self.feed(0.0, 30, 0.5)
+        self.classifier.positive_since = 0.3
+        self.assertEqual(self.step.get_load_start(make_frame(0.5, 0.5), self.detector), 0.3)
+
+    def test_ignores_dark_onset_long_before_the_load(self):
+        self.feed(0.0, 180, 1.0)
+        self.classifier.positive_since = 2.5
+        self.assertEqual(self.step.get_load_start(make_frame(2.6, 1.0), self.detector), 2.5)
+
+    def test_bright_frame_ends_dark_onset(self):
+        self.feed(0.0, 10, 1.0)
+        self.feed(0.2, 1, 0.0)
+        self.feed(0.3, 10, 1.0)
+        self.assertEqual(self.detector.dark_since, 0.3)
+        # Between the two shares the screen is neither dark nor bright again
+        self.feed(0.5, 1, 0.5)
+        self.assertEqual(self.detector.dark_since, 0.3)
+
+
+if __name__ == "__main__":
+    unittest.main()
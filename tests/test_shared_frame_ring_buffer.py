@@ -0,0 +1,77 @@
+import multiprocessing
+import tracemalloc
+import unittest
+
+import numpy as np
+
+from src.capture_worker import SharedFrameRingBuffer
+from src.frame import Frame
+from src.replay_buffer import ReplayBuffer
+
+frame_bytes = Frame.height * Frame.width * 3
+
+
+class SharedFrameRingBufferTest(unittest.TestCase):
+    def setUp(self):
+        self.ring_buffer = SharedFrameRingBuffer.create(multiprocessing.get_context("spawn"))
+
+    def tearDown(self):
+        self.ring_buffer.close(unlink=True)
+
+    def read_frame(self, value=100):
+        slot = self.ring_buffer.get_write_slot((Frame.height, Frame.width, 3), "rgb")
+        slot[:] = value
+        self.ring_buffer.commit(0, 0.0)
+        retval, frame, _ = self.ring_buffer.read_latest(0)
+        self.assertTrue(retval)
+        return frame
+
+    def assert_allocates_less(self, func, limit):
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, limit)
+
+    def test_read_is_a_view(self):
+        frame = self.read_frame()
+        self.assertTrue(np.shares_memory(frame.data, self.ring_buffer.buffer))
+
+    def test_thumbnail_only_frame_isnt_copied(self):
+        frame = self.read_frame()
+
+        def extract():
+            frame.get_gray_thumbnail()
+            frame.detach(keep_image=False)
+        self.assert_allocates_less(extract, frame_bytes // 10)
+
+        self.assertIsNone(frame.data)
+        self.assertFalse(frame.has_image())
+        self.assertEqual(frame.get_thumbnail_mean(), 100)
+
+    def test_kept_image_is_copied_once(self):
+        frame = self.read_frame()
+        frame.detach(keep_image=True)
+        self.assertFalse(np.shares_memory(frame.get_image(), self.ring_buffer.buffer))
+
+        # Overwriting the slot doesn't change the detached frame
+        self.ring_buffer.buffer[:] = 0
+        self.assertTrue(np.all(frame.get_image() == 100))
+
+    def test_replay_copy_is_shared_with_the_frame(self):
+        frame = self.read_frame()
+        frame.get_gray_thumbnail()
+        replay_buffer = ReplayBuffer()
+        replay_buffer.encode_thread = object()  # Keep the encoder from starting
+        replay_buffer.add(frame)
+
+        # The replay buffer's copy is the frame's data, keeping the image needs no second copy
+        self.assertFalse(np.shares_memory(frame.data, self.ring_buffer.buffer))
+        self.assert_allocates_less(lambda: frame.detach(keep_image=True), frame_bytes // 10)
+        self.assertIs(frame.get_image(), replay_buffer.encode_queue.get_nowait()[2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -38,6 +38,7 @@ class MainWindowUi(QMainWindow):
         self.splits_list = None
         self.page_dashboard_undo_btn = None
         self.page_dashboard_skip_btn = None
+        self.page_dashboard_save_replay_btn = None
         self.page_dashboard_load_count_widget = None
         self.page_dashboard_activations_widget = None
         self.page_dashboard_close_route_btn = None
@@ -229,8 +230,15 @@ class MainWindowUi(QMainWindow):
         self.page_dashboard_skip_btn.setFont(font_9pt)
         self.page_dashboard_skip_btn.setStyleSheet(Style.btn_centered)
 
+        self.page_dashboard_save_replay_btn = QPushButton("Save Replay")
+        self.page_dashboard_save_replay_btn.setFont(font_9pt)
+        self.page_dashboard_save_replay_btn.setStyleSheet(Style.btn_centered)
+        self.page_dashboard_save_replay_btn.setToolTip("Save the last few seconds of capture (F9)")
+        self.page_dashboard_save_replay_btn.setShortcut("F9")
+
         self.page_dashboard_skip_undo_layout.addWidget(self.page_dashboard_undo_btn)
         self.page_dashboard_skip_undo_layout.addWidget(self.page_dashboard_skip_btn)
+        self.page_dashboard_skip_undo_layout.addWidget(self.page_dashboard_save_replay_btn)
 
         self.page_dashboard_left_layout.addWidget(self.splits_list)
         self.page_dashboard_left_layout.addWidget(self.page_dashboard_skip_undo_widget)